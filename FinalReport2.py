@@ -4,8 +4,13 @@ from pathlib import Path
 
 import pandas as pd
 import os
-from Interface1WT.src.calculations import calculate_with_shutdown_from_db
+from Interface1WT.src.calculations import (
+    calculate_with_shutdown_from_db,
+    calculate_with_shutdown_batch,
+    calculate_daily_values_by_material,
+)
 from db_config import get_db_connection
+from Interface1WT.src.calc_cache import report_run
 from interface2_IST.src.CalculationIST import (
     total_menge_for_interval,
     calculate_category_h_concs,
@@ -59,19 +64,15 @@ def combined_export_to_excel(conn, start_date, end_date, version_name):
         )
 
         # Filter results to the desired date range
-        budget_forecast_data = []
-        if daily_budget_forecast:
-            for row in daily_budget_forecast:
-                try:
-                    formatted_date = pd.to_datetime(row['date'], format="%Y-%m-%d", errors='coerce')
-                    if start_date <= formatted_date <= end_date:  # Only include the desired date range
-                        budget_forecast_data.append({
-                            'Day': formatted_date.strftime("%Y-%m-%d"),
-                            'Budget in t': f"{round(row['budget'])}",
-                            'Forecast in t': f"{round(row['forecast'])}",
-                        })
-                except Exception as e:
-                    print(f"Error processing budget/forecast row: {row} - {e}")
+        in_range = daily_budget_forecast[daily_budget_forecast['date'].between(start_date, end_date)]
+        budget_forecast_data = [
+            {
+                'Day': row.date.strftime("%Y-%m-%d"),
+                'Budget in t': f"{round(row.budget)}",
+                'Forecast in t': f"{round(row.forecast)}",
+            }
+            for row in in_range.itertuples(index=False)
+        ]
 
         # Assuming the strings are in "YYYY-MM-DD" format
         start_date_formatted = datetime.strptime(full_month_start_date, "%Y-%m-%d %H:%S").strftime("%d.%m.%Y")
@@ -273,24 +274,25 @@ def summarized_report(start_date, end_date, version_name):
                 pd.to_datetime(start_date).replace(day=1) + pd.offsets.MonthEnd(0)
         ).strftime("%Y-%m-%d 23:59")
 
-        for f in filters:
+        # Daily budget and forecast values of all filters (shutdown and fact data are loaded once)
+        try:
+            daily_values_per_filter = calculate_with_shutdown_batch(
+                filters, month_start, month_end, version_name=version_name
+            )
+        except Exception as batch_error:
+            print(f"Error calculating budget and forecast values: {batch_error}")
+            daily_values_per_filter = [None] * len(filters)
+
+        for f, daily_values in zip(filters, daily_values_per_filter):
             try:
-                # Call the method to calculate daily budget and forecast values
-                daily_values = calculate_with_shutdown_from_db(
-                    material_type=f["material_type"],
-                    start_date=month_start,
-                    end_date=month_end,
-                    material_name=None,
-                    category=f["category"],
-                    version_name=version_name,
-                )
+                if daily_values is None:
+                    raise ValueError("No budget and forecast values for this filter.")
 
                 # Filter daily_values based on the user-specified interval
                 total_budget = 0
                 total_forecast = 0
-                if daily_values:
-                    df = pd.DataFrame(daily_values)
-                    df["date"] = pd.to_datetime(df["date"])
+                if not daily_values.empty:
+                    df = daily_values
                     filtered_df = df[(df["date"] >= pd.to_datetime(start_date)) & (df["date"] <= pd.to_datetime(end_date))]
                     total_budget = filtered_df["budget"].sum()
                     total_forecast = filtered_df["forecast"].sum()
@@ -354,11 +356,11 @@ def summarized_report(start_date, end_date, version_name):
 
 def fetch_available_versions():
     """
-    Fetch all unique version names from the database.
+    Fetch all registered version names from the database (oldest first).
     """
     try:
         conn = get_db_connection()
-        query = "SELECT DISTINCT version_name FROM fact_table"
+        query = "SELECT version_name FROM dim_version ORDER BY loaded_at"
         versions = pd.read_sql(query, conn)['version_name'].tolist()
         conn.close()
         return versions
@@ -399,6 +401,22 @@ def create_material_report(start_date, end_date, version_name):
         material_query = "SELECT dim_material_id, material_name, material_type, category FROM dbo.dim_material"
         materials = pd.read_sql_query(material_query, conn)
 
+        # Daily budget and forecast values of all materials in one computation
+        budget_forecast_lookup = {}
+        try:
+            daily_by_material = calculate_daily_values_by_material(
+                full_month_start_date, full_month_end_date, version_name=version_name
+            )
+
+            # Filter results to the desired date range
+            in_range = daily_by_material[daily_by_material['date'].between(start_date, end_date)]
+            budget_forecast_lookup = {
+                (row.dim_material_id, row.date.strftime("%Y-%m-%d")): (row.budget, row.forecast)
+                for row in in_range.itertuples(index=False)
+            }
+        except Exception as e:
+            print(f"Error processing budget/forecast data: {e}")
+
         report_data = []
         for _, material in materials.iterrows():
             try:
@@ -409,40 +427,6 @@ def create_material_report(start_date, end_date, version_name):
 
                 print(f"Processing material: {material_name} (ID: {material_id})")
 
-                # Initialize variables to hold budget/forecast data
-                budget_forecast_data = []
-
-                # Fetch budget and forecast data
-                try:
-                    daily_budget_forecast = calculate_with_shutdown_from_db(
-                        start_date=full_month_start_date,
-                        end_date=full_month_end_date,
-                        material_name=material_name,
-                        version_name=version_name
-                    )
-
-                    # Filter results to the desired date range
-                    if daily_budget_forecast:
-                        for row in daily_budget_forecast:
-                            try:
-                                if row.get('date') is None:
-                                    continue
-                                formatted_date = pd.to_datetime(row['date'], format="%Y-%m-%d", errors='coerce')
-                                if pd.isnull(formatted_date) or not (start_date <= formatted_date <= end_date):
-                                    continue
-
-                                budget = row.get('budget', 0)  # Default to 0 if null
-                                forecast = row.get('forecast', 0)  # Default to 0 if null
-                                budget_forecast_data.append({
-                                    'Day': formatted_date.strftime("%Y-%m-%d"),
-                                    'Budget': budget if budget else 0,  # Handle null values
-                                    'Forecast': forecast if forecast else 0  # Handle null values
-                                })
-                            except Exception as e:
-                                print(f"Error processing budget/forecast row for {material_name}: {e}")
-                except Exception as e:
-                    print(f"Error processing budget/forecast data for {material_name}: {e}")
-
                 # Fetch Ist values
 
                 ist_data = {}
@@ -461,9 +445,7 @@ def create_material_report(start_date, end_date, version_name):
                 days_in_interval = pd.date_range(start=start_date, end=end_date).strftime("%Y-%m-%d")
                 for day in days_in_interval:
                     try:
-                        budget_entry = next((entry for entry in budget_forecast_data if entry['Day'] == day), None)
-                        budget = budget_entry['Budget'] if budget_entry else 0
-                        forecast = budget_entry['Forecast'] if budget_entry else 0
+                        budget, forecast = budget_forecast_lookup.get((material_id, day), (0, 0))
 
                         # Extract Ist value for the specific material from the nested structure
                         ist_value = 0  # Default to 0 if not found
@@ -505,15 +487,17 @@ def combined_report(start_date, end_date, version_name, output_file):
     try:
         #connection_string = "Driver={ODBC Driver 17 for SQL Server};Server=10.2.144.12,1433;Database=master;UID=FHaachenP;PWD=HEjMxRdctaAo1!!;"
 
-        # Sheet 1: Combined Export Report
-        combined_export_df = combined_export_to_excel(get_db_connection(), start_date, end_date,
-                                                      version_name)
+        # The data state is read once, all cached calculations of the run are checked against it
+        with report_run():
+            # Sheet 1: Combined Export Report
+            combined_export_df = combined_export_to_excel(get_db_connection(), start_date, end_date,
+                                                          version_name)
 
-        # Sheet 2: Summarized Report
-        summarized_df = summarized_report(start_date, end_date, version_name)
+            # Sheet 2: Summarized Report
+            summarized_df = summarized_report(start_date, end_date, version_name)
 
-        # Sheet 3: Material values
-        material_df = create_material_report(start_date, end_date, version_name)
+            # Sheet 3: Material values
+            material_df = create_material_report(start_date, end_date, version_name)
 
         # Save to Excel
         with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
@@ -1,7 +1,10 @@
-import pandas as pd
+import time
 
 import db_config
+from excel_reader import read_excel
 from file_paths import path_materials
+from Interface1WT.src.data_loader import merge_material_table
+from Interface1WT.src.material_keys import find_trimmed_collisions, is_material_number, trim_material_number
 
 def create_material_table(cursor):
     query = """IF NOT EXISTS(SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'dim_material_2')
@@ -18,17 +21,30 @@ def create_material_table(cursor):
     print("dim_material number 2 table created.")
 
 def import_new_materialien_namen(file_path):
-    df = pd.read_excel(file_path, sheet_name="Materialien", dtype= str)
-    for _, row in df.iterrows():
-        trimmer_list = list(row['dim_material_id'])
-        trimmer_list[2] = ""
-        trimmer_list[4] = ""
-        trimmer_string = "".join(trimmer_list)
-        print(f"material_id is {trimmer_string}")
-        row['dim_material_id'] = trimmer_string
-
-        if pd.isna(row['category']):
-            row['category'] = ""
+    start = time.perf_counter()
+    df = read_excel(file_path, sheet_name="Materialien", dtype=str)
+    print(f"Read {len(df)} materials in {time.perf_counter() - start:.3f} s")
+
+    # The trimming below expects 7-digit material numbers
+    invalid_ids = df.loc[~is_material_number(df['dim_material_id']), 'dim_material_id']
+    if not invalid_ids.empty:
+        print(f"Material IDs that are not 7-digit material numbers: {invalid_ids.tolist()}")
+
+    # Drop the 3rd and 5th digit of all IDs at once
+    start = time.perf_counter()
+    trimmed_ids = trim_material_number(df['dim_material_id'])
+    print(f"Trimmed {len(df)} material IDs in {time.perf_counter() - start:.3f} s")
+
+    # Different materials that share a trimmed ID: the first one in the file is kept
+    collisions = find_trimmed_collisions(df['dim_material_id'], trimmed_ids)
+    for trimmed, sources in collisions.items():
+        print(f"[WARNING] Material IDs {', '.join(sources)} are all trimmed to {trimmed}. "
+              f"Keeping {sources[0]}, skipping {', '.join(sources[1:])}.")
+
+    df['dim_material_id'] = trimmed_ids
+    df = df.drop_duplicates(subset=['dim_material_id'], keep='first').reset_index(drop=True)
+    df['category'] = df['category'].fillna("")
+
     print(df)
     return df
 
@@ -41,16 +57,12 @@ def load_tableDB(cursor, dataframe):
             f"Invalid rows:\n{invalid_rows[['dim_material_id', 'material_name', 'material_type', 'category']]}"
         )"""
 
-    for _, row in dataframe.iterrows():
-        material_id = row['dim_material_id']
-        material_name = row['material_name']
-        material_type = row['material_type']
-        material_kategorie = row['category']
-        try:
-            query = f"INSERT INTO dim_material_2(dim_material_id, material_name, material_type, category) VALUES (?, ?, ?, ?)"
-            cursor.execute(query, (material_id, material_name,material_type,material_kategorie))
-        except Exception as e:
-            print(f"Error inserting for material {material_id}: {e}")
+    # Staged bulk load and one set-based MERGE (same path as dim_material)
+    start = time.perf_counter()
+    result = merge_material_table(cursor, dataframe, table_name="dim_material_2")
+    print(f"Merged materials into dim_material_2 in {time.perf_counter() - start:.3f} s: "
+          f"{result['inserted']} inserted, {result['updated']} updated, {result['unchanged']} unchanged")
+    return result
 
 def create_and_load():
     conn = None
@@ -59,10 +71,9 @@ def create_and_load():
         conn = db_config.get_db_connection()
         cursor = conn.cursor()
 
-        #create_material_table(cursor)
+        create_material_table(cursor)
         dataframe = import_new_materialien_namen(path_materials)
-        #load_tableDB(cursor, dataframe)
-        #print(dataframe)
+        load_tableDB(cursor, dataframe)
 
         #commit transaction
         conn.commit()
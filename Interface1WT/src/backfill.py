@@ -0,0 +1,160 @@
+"""
+Historical backfill: load every KS report of a folder in version order in a single run.
+
+Usage (from the project root):
+    python -m Interface1WT.src.backfill [--folder Input_Data/KS_Report] [--workers 4]
+
+The files are parsed in parallel worker processes while the already parsed versions are loaded one
+after another in version order, so every version is compared against its predecessor. The calendar
+is loaded and cached once for the whole run. Files that are already in the load ledger are skipped
+without parsing. Every version is committed on its own.
+"""
+import argparse
+import glob
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import db_config
+from file_paths import path_KSReport_folder
+from Interface1WT.src.data_loader import (
+    YEARS_TO_LOAD,
+    compute_file_fingerprint,
+    is_source_already_loaded,
+    load_dim_time_calendar,
+    load_ks_report,
+)
+from Interface1WT.src.ks_report import KSReport
+
+# Version number in the KS report file names, e.g. "KS_Report_Ver_1.xlsx", "KS_Ver_6.xlsm"
+VERSION_NUMBER = re.compile(r"Ver_(\d+)", re.IGNORECASE)
+
+
+def list_ks_reports(folder):
+    """
+    List the KS report files of a folder in version order.
+    Files without a version number in their name follow, ordered by modification time.
+
+    Args:
+        folder (str): Folder with KS report files.
+
+    Returns:
+        list: File paths in load order.
+    """
+    files = [f for f in glob.glob(os.path.join(folder, '*.xls*')) if f.lower().endswith(('.xlsx', '.xlsm'))]
+
+    def version_order(file_path):
+        match = VERSION_NUMBER.search(os.path.basename(file_path))
+        version_number = int(match.group(1)) if match else None
+        return version_number is None, version_number or 0, os.path.getmtime(file_path)
+
+    return sorted(files, key=version_order)
+
+
+def parse_ks_report(file_path):
+    """
+    Parse one KS report (runs in a worker process, the files are parsed in parallel).
+
+    Args:
+        file_path (str): Path to the KS report file.
+
+    Returns:
+        KSReport: Parsed KS report workbook.
+    """
+    return KSReport(file_path)
+
+
+def backfill(folder=path_KSReport_folder, workers=None, years_to_load=YEARS_TO_LOAD):
+    """
+    Load all KS reports of a folder in version order.
+
+    Args:
+        folder (str): Folder with KS report files.
+        workers (int): Number of parsing processes (defaults to the CPU count).
+        years_to_load (list): Years of data to load.
+
+    Returns:
+        list: (file name, row counts or the reason why it was not loaded) per processed file.
+              The run stops at the first file that fails, the remaining files are not listed.
+    """
+    conn = None
+    cursor = None
+    results = []
+    try:
+        conn = db_config.get_db_connection()
+        cursor = conn.cursor()
+
+        files = list_ks_reports(folder)
+        print(f"Found {len(files)} KS reports in {folder}:")
+        for file_path in files:
+            print(f"  {os.path.basename(file_path)}")
+
+        # Skip files that were already ingested before parsing them
+        pending = []
+        for file_path in files:
+            fingerprint = compute_file_fingerprint(file_path)
+            if is_source_already_loaded(cursor, fingerprint):
+                print(f"[SKIP] {os.path.basename(file_path)} was already loaded.")
+                results.append((os.path.basename(file_path), "skipped (already loaded)"))
+            else:
+                pending.append((file_path, fingerprint))
+
+        if not pending:
+            print("Nothing to backfill.")
+            return results
+
+        # Calendar and its cache are shared by all versions
+        load_dim_time_calendar(cursor, years_to_load)
+        conn.commit()
+
+        workers = workers or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(pending)))
+        try:
+            # The files are parsed in parallel, the results are loaded in version order
+            futures = [executor.submit(parse_ks_report, file_path) for file_path, _ in pending]
+
+            for (file_path, fingerprint), future in zip(pending, futures):
+                file_name = os.path.basename(file_path)
+                try:
+                    report = future.result()
+                    print(f"\n=== Loading {file_name} (version '{report.version_name}') ===")
+                    row_counts = load_ks_report(cursor, report, fingerprint, years_to_load)
+                    conn.commit()
+                except Exception as e:
+                    print(f"Error loading {file_name}: {e}")
+                    conn.rollback()
+                    results.append((file_name, f"failed: {e}"))
+                    # Later versions would be compared against the wrong predecessor
+                    print("Backfill stopped, the remaining files are not loaded.")
+                    break
+
+                if row_counts["loaded"]:
+                    results.append((file_name, row_counts))
+                else:
+                    results.append((file_name, "not loaded (see the checks above)"))
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+        print("\nBackfill completed:")
+        for file_name, outcome in results:
+            print(f"  {file_name}: {outcome}")
+        return results
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load every KS report of a folder in version order.")
+    parser.add_argument("--folder", default=path_KSReport_folder, help="Folder with the KS report files.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of parsing processes.")
+    args = parser.parse_args()
+
+    backfill(args.folder, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import contextlib
+import copy
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+from collections import OrderedDict
+
+from db_config import get_db_connection
+
+
+# Number of results kept in memory (least recently used results are dropped first)
+CALC_CACHE_SIZE = int(os.environ.get("CALC_CACHE_SIZE", "128"))
+
+# Folder of the optional on-disk tier (disabled if not set), results survive between report runs
+CALC_CACHE_DIR = os.environ.get("CALC_CACHE_DIR")
+
+
+def get_data_token(conn=None):
+    """
+    Read a fingerprint of the data the calculations depend on: number and newest load of the registered
+    versions, newest fact row id and fact row count (from the partition metadata, no table scan),
+    and row count and highest row_version of fact_current and dim_material (names and categories are
+    used by the material filters and are merged on every load, also when no version is written).
+    row_version increases on every insert and update (see schema_creator.add_row_version_columns),
+    so every change of the two tables gives a new token.
+
+    Args:
+        conn: Open database connection to use, a new connection is opened if None.
+
+    Returns:
+        tuple: Data token.
+    """
+    own_connection = conn is None
+    if own_connection:
+        conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM dim_version),
+                (SELECT MAX(loaded_at) FROM dim_version),
+                (SELECT MAX(id) FROM fact_table),
+                (SELECT SUM(row_count) FROM sys.dm_db_partition_stats
+                 WHERE object_id = OBJECT_ID('fact_table') AND index_id IN (0, 1)),
+                (SELECT COUNT(*) FROM fact_current),
+                (SELECT CONVERT(BIGINT, MAX(row_version)) FROM fact_current),
+                (SELECT COUNT(*) FROM dim_material),
+                (SELECT CONVERT(BIGINT, MAX(row_version)) FROM dim_material)
+        """)
+        token = tuple(str(value) for value in cursor.fetchone())
+        cursor.close()
+        return token
+    finally:
+        if own_connection:
+            conn.close()
+
+
+# Token pinned by report_run, None outside of a report run
+_run_token = None
+
+
+@contextlib.contextmanager
+def report_run(conn=None):
+    """
+    Read the data token once and use it for all cached calculations of the block (one report run),
+    so cache hits do not need a database round trip.
+
+    Args:
+        conn: Open database connection for reading the token, a new connection is opened if None.
+    """
+    global _run_token
+    previous_token = _run_token
+    _run_token = get_data_token(conn)
+    try:
+        yield
+    finally:
+        _run_token = previous_token
+
+
+def _freeze(value):
+    """
+    Convert call arguments into a hashable, stable cache key part.
+    Dicts and lists are converted recursively, callables (e.g. report callbacks in filter specs) are ignored.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items() if not callable(item)))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class CalculationCache:
+    """
+    Two-tier cache for budget/forecast calculation results.
+
+    Results are stored with the data token of the moment they were computed and are only returned
+    while the token is unchanged. The memory tier is a size-bounded LRU, the optional disk tier keeps
+    one pickle file per key.
+    """
+
+    def __init__(self, max_entries=CALC_CACHE_SIZE, cache_dir=CALC_CACHE_DIR):
+        """
+        Args:
+            max_entries (int): Maximum number of results in memory.
+            cache_dir (str): Folder of the disk tier, None to disable it.
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.pkl")
+
+    def get(self, key, token):
+        """
+        Look up the result of a key for the current data token. Stale results are dropped.
+
+        Returns:
+            tuple: (found, copy of the cached result or None).
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] == token:
+                self._entries.move_to_end(key)
+                return True, copy.deepcopy(entry[1])
+            # Stale result
+            del self._entries[key]
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            if os.path.exists(path):
+                try:
+                    with open(path, "rb") as f:
+                        disk_key, disk_token, value = pickle.load(f)
+                except Exception as e:
+                    print(f"Ignoring unreadable cache file {path}: {e}")
+                    disk_key, disk_token, value = None, None, None
+
+                if disk_key == key and disk_token == token:
+                    self._store_in_memory(key, token, value)
+                    return True, copy.deepcopy(value)
+                os.remove(path)
+
+        return False, None
+
+    def put(self, key, token, value):
+        """
+        Store a result for the data token in memory and on disk.
+        """
+        self._store_in_memory(key, token, copy.deepcopy(value))
+
+        if self.cache_dir:
+            with open(self._disk_path(key), "wb") as f:
+                pickle.dump((key, token, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _store_in_memory(self, key, token, value):
+        self._entries[key] = (token, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Drop all results from memory and disk.
+        """
+        self._entries.clear()
+        if self.cache_dir:
+            for file_name in os.listdir(self.cache_dir):
+                if file_name.endswith(".pkl"):
+                    os.remove(os.path.join(self.cache_dir, file_name))
+
+
+# Cache shared by all calculation functions of the process
+calculation_cache = CalculationCache()
+
+
+def cached_calculation(func):
+    """
+    Memoize a budget/forecast calculation on its arguments (version_name, date range, filters, ...)
+    and the current data token.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (func.__name__, _freeze(dict(bound.arguments)))
+
+        token = _run_token if _run_token is not None else get_data_token()
+        found, result = calculation_cache.get(key, token)
+        if found:
+            print(f"Using cached result of {func.__name__}.")
+            return result
+
+        result = func(*args, **kwargs)
+        calculation_cache.put(key, token, result)
+        return result
+
+    return wrapper
@@ -1,151 +1,251 @@
 from db_config import get_db_connection
 from file_paths import path_variables
+from Interface1WT.src.calc_cache import cached_calculation
 
-def calculate_total_budget_and_forecast(conn, start_date, end_date, material_name=None, material_type=None, category=None, version_name=None):
+def _fact_source(version_name=None, as_of=None):
+    """
+    Return the fact rows to read from: the values in force at a point in time (dbo.fact_as_of) if as_of
+    is given, the complete logical version (dbo.fact_version) if a version is given, otherwise the
+    current-state snapshot fact_current (latest value per cell).
+
+    Args:
+        version_name: Specific version of the data or None.
+        as_of: Point in time (str, datetime or pd.Timestamp) or None.
+
+    Returns:
+        tuple: (FROM clause, list of parameters for it)
+    """
     import pandas as pd
-    from pandas.tseries.offsets import MonthEnd
 
-    try:
-        # Parse the dates
-        start_date = pd.to_datetime(start_date)
-        end_date = pd.to_datetime(end_date)
-        print(f"Debug: Start Date: {start_date}, End Date: {end_date}")
+    if as_of is not None:
+        return "dbo.fact_as_of(?)", [pd.to_datetime(as_of).to_pydatetime()]
+    if version_name:
+        return "dbo.fact_version(?)", [version_name]
+    return "fact_current", []
 
-        # Build and execute the material filter query
-        material_filter_query = "SELECT dim_material_id FROM dim_material WHERE 1=1"
-        params = []
-
-        if material_name:
-            material_filter_query += " AND material_name = ?"
-            params.append(material_name)
-        if material_type:
-            material_filter_query += " AND material_type = ?"
-            params.append(material_type)
-        if category:
-            material_filter_query += " AND category = ?"
-            params.append(category)
-
-        material_ids_result = pd.read_sql_query(material_filter_query, conn, params=params)
-        if material_ids_result.empty:
-            raise ValueError("No materials found with the specified criteria.")
-
-        material_ids = material_ids_result['dim_material_id'].tolist()
-        print(f"Debug: Material IDs: {material_ids}")
-
-        # Modify the main query to include version_name filtering
-        query = "SELECT * FROM fact_table WHERE material_id IN ({})".format(','.join(['?'] * len(material_ids)))
-        if version_name:
-            query += " AND version_name = ?"
-            params.append(version_name)
-
-        df = pd.read_sql_query(query, conn, params=material_ids + ([version_name] if version_name else []))
-        print(f"Debug: Retrieved DataFrame shape: {df.shape}")
 
-        # Assign rows to budget and forecast cycles
-        budget_data = pd.DataFrame()
-        forecast_data = pd.DataFrame()
+def get_values_as_of(conn, as_of, scenarios=("budget", "forecast"), material_ids=None):
+    """
+    Retrieve the budget, forecast or shutdown values that were in force at a point in time.
+
+    Args:
+        conn: Database connection object.
+        as_of: Point in time (str, datetime or pd.Timestamp), e.g. '2024-06-30 23:59'.
+        scenarios: Scenarios to return ('budget', 'forecast', 'budget_shutdown', 'forecast_shutdown').
+        material_ids: Optional list of material IDs to restrict the result to.
 
-        total_rows = len(df)
-        rows_per_material = 24
-        num_materials = len(material_ids)
+    Returns:
+        DataFrame with material_id, scenario, year, month, day, version_name, value and inserted_date
+        (one row per material, time and scenario).
+    """
+    import pandas as pd
 
-        for material_idx in range(num_materials):
-            start_idx_budget = material_idx * rows_per_material
-            end_idx_budget = start_idx_budget + rows_per_material
+    fact_source, source_params = _fact_source(as_of=as_of)
+    query = """
+        SELECT ft.material_id, ft.scenario, dt.year, dt.month, dt.day, ft.version_name, ft.value, ft.inserted_date
+        FROM {} ft
+        INNER JOIN dim_time dt ON ft.time_id = dt.dim_time_id
+        WHERE ft.scenario IN ({})
+    """.format(fact_source, ','.join(['?'] * len(scenarios)))
+    params = source_params + list(scenarios)
 
-            start_idx_forecast = total_rows // 2 + material_idx * rows_per_material
-            end_idx_forecast = start_idx_forecast + rows_per_material
+    if material_ids:
+        query += " AND ft.material_id IN ({})".format(','.join(['?'] * len(material_ids)))
+        params += list(material_ids)
 
-            # Ensure indices are within range
-            if start_idx_budget < total_rows:
-                budget_data = pd.concat([budget_data, df.iloc[start_idx_budget:end_idx_budget]])
+    df = pd.read_sql_query(query, conn, params=params)
+    print(f"Debug: Retrieved {len(df)} values in force at {as_of}.")
+    return df
 
-            if start_idx_forecast < total_rows:
-                forecast_data = pd.concat([forecast_data, df.iloc[start_idx_forecast:end_idx_forecast]])
 
-        print(f"Debug: Budget DataFrame shape: {budget_data.shape}")
-        print(f"Debug: Forecast DataFrame shape: {forecast_data.shape}")
+def _pivot_month_columns(df, prefix):
+    """
+    Pivot long fact rows into one row per material with one column per month (e.g. 'b_jan_23').
 
-        # Ensure 'b_' and 'f_' columns exist
-        budget_columns = [col for col in budget_data.columns if col.startswith("b_")]
-        forecast_columns = [col for col in forecast_data.columns if col.startswith("f_")]
+    Args:
+        df: DataFrame with material_id, year, month and value.
+        prefix: Column prefix, 'b_' for budget or 'f_' for forecast.
 
-        print(f"Debug: Budget Columns: {budget_columns}")
-        print(f"Debug: Forecast Columns: {forecast_columns}")
+    Returns:
+        DataFrame with material_id and the month columns.
+    """
+    import pandas as pd
 
-        if not budget_columns:
-            raise ValueError("No budget columns found in the dataset.")
-        if not forecast_columns:
-            raise ValueError("No forecast columns found in the dataset.")
+    df = df.assign(
+        column=prefix + pd.to_datetime(df[['year', 'month']].assign(day=1)).dt.strftime('%b_%y').str.lower()
+    )
+    return df.pivot_table(
+        index='material_id', columns='column', values='value', aggfunc='sum', fill_value=0
+    ).reset_index()
 
-        results = {}
-        total_budget_sum = 0
-        total_forecast_sum = 0
 
-        # Generate column names for the relevant months
-        relevant_months = pd.date_range(start=start_date, end=end_date, freq='MS')
-        print(f"Debug: Relevant Months: {relevant_months}")
+def _month_hours_table(start_date, end_date):
+    """
+    Build the month-hours table of an interval: one row per month that starts inside [start_date, end_date]
+    with the hours of the month and the hours of the month that fall into the interval.
 
-        # Process each material
-        for material_id in material_ids:
-            print(f"Debug: Processing Material ID: {material_id}")
-            material_budget_rows = budget_data[budget_data['material_id'] == material_id]
-            material_forecast_rows = forecast_data[forecast_data['material_id'] == material_id]
+    Args:
+        start_date (pd.Timestamp): Start of the interval.
+        end_date (pd.Timestamp): End of the interval.
 
-            print(f"Debug: Budget Rows for Material {material_id}: {material_budget_rows.shape[0]}")
-            print(f"Debug: Forecast Rows for Material {material_id}: {material_forecast_rows.shape[0]}")
+    Returns:
+        DataFrame with year, month, month_hours and interval_hours.
+    """
+    import pandas as pd
+    from pandas.tseries.offsets import MonthEnd
 
-            total_budget = 0
-            total_forecast = 0
+    rows = []
+    for month_start in pd.date_range(start=start_date, end=end_date, freq='MS'):
+        month_end = month_start + MonthEnd(0)
+        start_of_month = max(start_date, month_start)
 
-            for month_start in relevant_months:
-                month_str = month_start.strftime('%b_%y').lower()
+        if month_end.month == end_date.month and month_end.year == end_date.year:
+            end_of_month = end_date
+        else:
+            end_of_month = month_end.replace(hour=23, minute=59, second=59)
 
-                # Extract budget and forecast for the month
-                budget_column = f"b_{month_str}"
-                forecast_column = f"f_{month_str}"
+        rows.append({
+            'year': month_start.year,
+            'month': month_start.month,
+            'month_hours': month_end.day * 24,
+            'interval_hours': (end_of_month - start_of_month).total_seconds() / 3600,
+        })
+    return pd.DataFrame(rows, columns=['year', 'month', 'month_hours', 'interval_hours'])
 
-                monthly_budget = (
-                    material_budget_rows[budget_column].sum()
-                    if budget_column in material_budget_rows.columns
-                    else 0
-                )
-                monthly_forecast = (
-                    material_forecast_rows[forecast_column].sum()
-                    if forecast_column in material_forecast_rows.columns
-                    else 0
-                )
 
-                print(f"Debug: Material ID {material_id}, Budget Column {budget_column}, Monthly Budget {monthly_budget}")
-                print(f"Debug: Material ID {material_id}, Forecast Column {forecast_column}, Monthly Forecast {monthly_forecast}")
+def _prorate_monthly_values(df, start_date, end_date, month_hours=None):
+    """
+    Prorate monthly budget and forecast values to an interval by its hours in each month.
+
+    Args:
+        df: Long fact rows with material_id, scenario ('budget'/'forecast'), year, month and value.
+        start_date (pd.Timestamp): Start of the interval.
+        end_date (pd.Timestamp): End of the interval.
+        month_hours: Month-hours table of the interval (built if not given).
 
-                days_in_month = (month_start + MonthEnd(0)).day
-                budget_hourly_value = monthly_budget / (days_in_month * 24)
-                forecast_hourly_value = monthly_forecast / (days_in_month * 24)
+    Returns:
+        DataFrame with material_id, total_budget and total_forecast (materials with values in the interval).
+    """
+    import pandas as pd
 
-                start_of_month = max(start_date, month_start)
-                month_end = month_start + MonthEnd(0)
+    # One value per material, scenario and month
+    monthly = df.groupby(['material_id', 'scenario', 'year', 'month'], as_index=False, sort=False)['value'].sum()
 
-                if month_end.month == end_date.month and month_end.year == end_date.year:
-                    end_of_month = end_date
-                else:
-                    end_of_month = month_end.replace(hour=23, minute=59, second=59)
+    # Hourly value of the month times the hours of the month inside the interval
+    if month_hours is None:
+        month_hours = _month_hours_table(start_date, end_date)
+    monthly = monthly.merge(month_hours, on=['year', 'month'], how='inner')
+    monthly['prorated'] = monthly['interval_hours'] * (monthly['value'] / monthly['month_hours'])
+    if monthly.empty:
+        return pd.DataFrame(columns=['material_id', 'total_budget', 'total_forecast'])
 
-                interval_hours = (end_of_month - start_of_month).total_seconds() / 3600
-                total_budget += interval_hours * budget_hourly_value
-                total_forecast += interval_hours * forecast_hourly_value
+    totals = monthly.pivot_table(
+        index='material_id', columns='scenario', values='prorated', aggfunc='sum', fill_value=0
+    )
+    totals = totals.reindex(columns=['budget', 'forecast'], fill_value=0)
+    return totals.rename(columns={'budget': 'total_budget', 'forecast': 'total_forecast'}).reset_index()
 
-                print(f"Debug: Material ID {material_id}, Interval Hours {interval_hours}, Budget Contribution {total_budget}, Forecast Contribution {total_forecast}")
 
-            # Store results for the material
-            results[material_id] = {
-                "total_budget": total_budget,
-                "total_forecast": total_forecast,
-            }
+def _load_budget_forecast_rows(conn, month_hours, version_name=None, as_of=None, material_name=None,
+                               material_type=None, category=None):
+    """
+    Read the monthly budget and forecast rows of the months in month_hours with one query joined to dim_material.
 
-            # Update the overall totals
-            total_budget_sum += total_budget
-            total_forecast_sum += total_forecast
+    Args:
+        conn: Database connection object.
+        month_hours: Month-hours table of the interval (see _month_hours_table).
+        version_name: Specific version of the data or None.
+        as_of: Point in time whose values are used instead of a version (optional).
+        material_name, material_type, category: Optional material filters.
+
+    Returns:
+        DataFrame with material_id, material_name, material_type, category, scenario, year, month and value.
+    """
+    import pandas as pd
+
+    columns = ['material_id', 'material_name', 'material_type', 'category', 'scenario', 'year', 'month', 'value']
+    if month_hours.empty:
+        return pd.DataFrame(columns=columns)
+
+    first_month = pd.Timestamp(year=month_hours['year'].iloc[0], month=month_hours['month'].iloc[0], day=1)
+    last_month = pd.Timestamp(year=month_hours['year'].iloc[-1], month=month_hours['month'].iloc[-1], day=1)
+
+    # Complete logical version (or latest values) joined to the material filter and the months
+    fact_source, source_params = _fact_source(version_name, as_of)
+    query = """
+        SELECT ft.material_id, dm.material_name, dm.material_type, dm.category,
+               ft.scenario, dt.year, dt.month, ft.value
+        FROM {} ft
+        INNER JOIN dim_material dm ON ft.material_id = dm.dim_material_id
+        INNER JOIN dim_time dt ON ft.time_id = dt.dim_time_id
+        WHERE ft.scenario IN ('budget', 'forecast')
+          AND dt.day = 0
+          AND DATEFROMPARTS(dt.year, dt.month, 1) BETWEEN ? AND ?
+    """.format(fact_source)
+    params = source_params + [first_month.date(), last_month.date()]
+
+    if material_name:
+        query += " AND dm.material_name = ?"
+        params.append(material_name)
+    if material_type:
+        query += " AND dm.material_type = ?"
+        params.append(material_type)
+    if category:
+        query += " AND dm.category = ?"
+        params.append(category)
+
+    df = pd.read_sql_query(query, conn, params=params)
+    print(f"Debug: Retrieved DataFrame shape: {df.shape}")
+    return df
+
+
+def _budget_forecast_totals(df, start_date, end_date, month_hours):
+    """
+    Prorate the budget and forecast rows of the selected materials to the interval and sum them.
+    Zero cells are not stored by delta loads, so a scenario without rows counts as 0.
+
+    Args:
+        df: Rows from _load_budget_forecast_rows (already filtered to the materials).
+        start_date (pd.Timestamp): Start of the interval.
+        end_date (pd.Timestamp): End of the interval.
+        month_hours: Month-hours table of the interval.
+
+    Returns:
+        tuple: (total budget, total forecast)
+
+    Raises:
+        ValueError: If no rows were found for the selected materials.
+    """
+    if df.empty:
+        raise ValueError("No materials found with the specified criteria.")
+
+    # Prorate all materials and months at once
+    material_totals = _prorate_monthly_values(df, start_date, end_date, month_hours)
+    print(f"Debug: Totals per material:\n{material_totals}")
+
+    return float(material_totals['total_budget'].sum()), float(material_totals['total_forecast'].sum())
+
+
+def calculate_total_budget_and_forecast(conn, start_date, end_date, material_name=None, material_type=None, category=None, version_name=None, as_of=None):
+    import pandas as pd
+
+    try:
+        # Parse the dates
+        start_date = pd.to_datetime(start_date)
+        end_date = pd.to_datetime(end_date)
+        print(f"Debug: Start Date: {start_date}, End Date: {end_date}")
+
+        # Months that start inside the interval (only these are prorated)
+        month_hours = _month_hours_table(start_date, end_date)
+        if month_hours.empty:
+            raise ValueError("No month starts inside the specified date range.")
+
+        # One query for the selected materials and months
+        df = _load_budget_forecast_rows(
+            conn, month_hours, version_name=version_name, as_of=as_of,
+            material_name=material_name, material_type=material_type, category=category
+        )
+        total_budget_sum, total_forecast_sum = _budget_forecast_totals(df, start_date, end_date, month_hours)
 
         # Modified Return Logic
         conn.close()
@@ -176,18 +276,27 @@ def retrieve_budget_and_forecast_by_material(conn):
     import pandas as pd
 
     try:
-        # Query the data
-        query = "SELECT * FROM fact_table"
+        # Query the latest values
+        query = """
+            SELECT ft.material_id, ft.scenario, dt.year, dt.month, ft.value
+            FROM fact_current ft
+            INNER JOIN dim_time dt ON ft.time_id = dt.dim_time_id
+            WHERE ft.scenario IN ('budget', 'forecast') AND ft.material_id IS NOT NULL
+        """
         df = pd.read_sql_query(query, conn)
         print(f"Debug: Retrieved DataFrame shape: {df.shape}")
 
+        # One row per material with one column per month
+        budget_df = _pivot_month_columns(df[df['scenario'] == 'budget'], prefix="b_").set_index('material_id')
+        forecast_df = _pivot_month_columns(df[df['scenario'] == 'forecast'], prefix="f_").set_index('material_id')
+
         # Extract material IDs
-        material_ids = df['material_id'].dropna().unique()
+        material_ids = df['material_id'].unique()
         print(f"Debug: Unique Material IDs: {material_ids}")
 
         # Identify budget and forecast columns
-        budget_columns = [col for col in df.columns if col.startswith("b_")]
-        forecast_columns = [col for col in df.columns if col.startswith("f_")]
+        budget_columns = list(budget_df.columns)
+        forecast_columns = list(forecast_df.columns)
 
         print(f"Debug: Budget Columns: {budget_columns}")
         print(f"Debug: Forecast Columns: {forecast_columns}")
@@ -199,24 +308,15 @@ def retrieve_budget_and_forecast_by_material(conn):
         for material_id in material_ids:
             print(f"Debug: Processing Material ID: {material_id}")
 
-            # Filter rows for the current material
-            material_rows = df[df['material_id'] == material_id]
-
-            # Split into budget and forecast cycles
-            first_row_idx = material_rows.index[0]
-            last_row_idx = material_rows.index[-1]
-            num_rows = len(material_rows)
-
-            # Determine split point for cycles
-            split_idx = (num_rows // 2) + first_row_idx
-
-            # Extract budget and forecast rows
-            budget_rows = material_rows.loc[first_row_idx:split_idx - 1]
-            forecast_rows = material_rows.loc[split_idx:last_row_idx]
-
             # Aggregate budget and forecast values
-            budget_values = budget_rows[budget_columns].sum(axis=0).to_dict()
-            forecast_values = forecast_rows[forecast_columns].sum(axis=0).to_dict()
+            budget_values = (
+                budget_df.loc[material_id].to_dict() if material_id in budget_df.index
+                else dict.fromkeys(budget_columns, 0)
+            )
+            forecast_values = (
+                forecast_df.loc[material_id].to_dict() if material_id in forecast_df.index
+                else dict.fromkeys(forecast_columns, 0)
+            )
 
             # Store in results
             results[str(material_id)] = {
@@ -234,7 +334,7 @@ def retrieve_budget_and_forecast_by_material(conn):
         return {}
 
 
-def get_shutdown_dates(conn, start_date, end_date, version_name=None):
+def get_shutdown_dates(conn, start_date, end_date, version_name=None, as_of=None):
     """
     Retrieve the dates with shutdown hours for both budget and forecast from the fact_table
     and link them to the dim_time table within a specific date range, filtered by version name.
@@ -244,6 +344,7 @@ def get_shutdown_dates(conn, start_date, end_date, version_name=None):
         start_date: Start date of the date range (inclusive).
         end_date: End date of the date range (inclusive).
         version_name: Specific version of the data to filter by.
+        as_of: Point in time whose values are used instead of a version (optional).
 
     Returns:
         A DataFrame containing the shutdown dates and their respective shutdown hours for budget and forecast.
@@ -251,27 +352,28 @@ def get_shutdown_dates(conn, start_date, end_date, version_name=None):
     import pandas as pd
 
     try:
-        # Base query to fetch relevant data from fact_table and dim_time
-        query = """
+        # Base query to fetch relevant data from the fact rows (complete logical version) and dim_time
+        fact_source, source_params = _fact_source(version_name, as_of)
+        query = f"""
             SELECT 
-                ft.bdgt_shutdown_hours AS budget_shutdown_hours,
-                ft.fcst_shutdown_hours AS forecast_shutdown_hours,
+                CASE WHEN ft.scenario = 'budget_shutdown' THEN ft.value ELSE 0 END AS budget_shutdown_hours,
+                CASE WHEN ft.scenario = 'forecast_shutdown' THEN ft.value ELSE 0 END AS forecast_shutdown_hours,
                 dt.year,
                 dt.month,
                 dt.day,
                 ft.version_name
             FROM 
-                fact_table ft
+                {fact_source} ft
             INNER JOIN 
                 dim_time dt
             ON 
                 ft.time_id = dt.dim_time_id
             WHERE 
-                (ft.bdgt_shutdown_hours > 0 OR ft.fcst_shutdown_hours > 0)
+                ft.scenario IN ('budget_shutdown', 'forecast_shutdown') AND ft.value > 0
         """
 
         # Execute the query and fetch data
-        shutdown_data = pd.read_sql_query(query, conn)
+        shutdown_data = pd.read_sql_query(query, conn, params=source_params)
 
         # Create a new column with the full date
         shutdown_data['date'] = pd.to_datetime(shutdown_data[['year', 'month', 'day']])
@@ -282,8 +384,8 @@ def get_shutdown_dates(conn, start_date, end_date, version_name=None):
             (shutdown_data['date'] <= pd.to_datetime(end_date))
         ]
 
-        # If version_name is provided, filter by version_name
-        if version_name:
+        # If version_name is provided (and no point in time), filter by version_name
+        if version_name and as_of is None:
             shutdown_data = shutdown_data[shutdown_data['version_name'] == version_name]
 
         # Replace NaN values with 0 for shutdown hours
@@ -305,48 +407,333 @@ def get_shutdown_dates(conn, start_date, end_date, version_name=None):
 
 
 
-def calculate_with_shutdown_from_db(material_type=None, start_date=None, end_date=None, material_name=None, category=None, version_name=None):
+def _daily_working_hours(start_date, end_date, shutdown_data):
     """
-    Calculate daily budget and forecast values considering shutdown hours.
+    Join a daily calendar of the interval with the shutdown hours per day.
 
     Args:
-        material_type: Filter by material type.
+        start_date: Start date of the interval.
+        end_date: End date of the interval.
+        shutdown_data: DataFrame with date, budget_shutdown_hours and forecast_shutdown_hours.
+
+    Returns:
+        DataFrame with one row per day: date, budget_hours and forecast_hours
+        (24 hours minus the shutdown hours of the day, at least 0).
+    """
+    import pandas as pd
+
+    # Shutdown hours per calendar day (0 for days without shutdown)
+    shutdown_per_day = shutdown_data.groupby('date')[['budget_shutdown_hours', 'forecast_shutdown_hours']].sum()
+    daily = pd.DataFrame({'date': pd.date_range(start=start_date, end=end_date)}).join(shutdown_per_day, on='date')
+    daily[['budget_shutdown_hours', 'forecast_shutdown_hours']] = daily[
+        ['budget_shutdown_hours', 'forecast_shutdown_hours']
+    ].fillna(0)
+
+    daily['budget_hours'] = (24 - daily['budget_shutdown_hours']).clip(lower=0)
+    daily['forecast_hours'] = (24 - daily['forecast_shutdown_hours']).clip(lower=0)
+    return daily[['date', 'budget_hours', 'forecast_hours']]
+
+
+def _allocate_daily_values(start_date, end_date, shutdown_data, hourly_budget, hourly_forecast):
+    """
+    Allocate hourly budget and forecast values to the days of an interval by their working hours
+    (24 hours minus the shutdown hours of the day).
+
+    Args:
+        start_date: Start date of the interval.
+        end_date: End date of the interval.
+        shutdown_data: DataFrame with date, budget_shutdown_hours and forecast_shutdown_hours.
+        hourly_budget: Budget value per working hour (0 for no budget).
+        hourly_forecast: Forecast value per working hour (0 for no forecast).
+
+    Returns:
+        DataFrame with one row per day: date, budget and forecast.
+    """
+    daily = _daily_working_hours(start_date, end_date, shutdown_data)
+
+    # Working hours times the hourly values
+    daily['budget'] = (daily['budget_hours'] * hourly_budget).round(3)
+    daily['forecast'] = (daily['forecast_hours'] * hourly_forecast).round(3)
+
+    return daily[['date', 'budget', 'forecast']]
+
+
+def _daily_values_from_totals(start_date, end_date, shutdown_data, budget_total, forecast_total):
+    """
+    Spread budget and forecast totals of an interval over its working hours and allocate them to the days.
+
+    Args:
+        start_date: Start date of the interval.
+        end_date: End date of the interval.
+        shutdown_data: DataFrame with date, budget_shutdown_hours and forecast_shutdown_hours (no NaN).
+        budget_total: Total budget of the interval.
+        forecast_total: Total forecast of the interval.
+
+    Returns:
+        DataFrame with one row per day: date, budget and forecast.
+
+    Raises:
+        ValueError: If both totals are 0.
+    """
+    import pandas as pd
+
+    # Sum shutdown hours within the date range
+    total_budget_shutdown_hours = shutdown_data['budget_shutdown_hours'].sum()
+    total_forecast_shutdown_hours = shutdown_data['forecast_shutdown_hours'].sum()
+
+    # Debug: Display summed shutdown hours
+    print(f"Total budget shutdown hours in date range: {total_budget_shutdown_hours}")
+    print(f"Total forecast shutdown hours in date range: {total_forecast_shutdown_hours}")
+
+    # Round the totals to the nearest integer
+    budget_total = round(budget_total, 3)
+    forecast_total = round(forecast_total, 3)
+
+    print(f"Budget total: {budget_total}")
+    print(f"Forecast total: {forecast_total}")
+
+    if budget_total == 0 and forecast_total == 0:
+        raise ValueError("Both budget and forecast totals are invalid; cannot proceed.")
+
+    # Get the total hours in the interval
+    total_hours_in_interval = ((pd.to_datetime(end_date) - pd.to_datetime(start_date)).days + 1) * 24
+    print(f"Total hours in interval: {total_hours_in_interval}")
+
+    # Calculate hourly values with shutdown
+    hourly_budget_with_shutdown = (
+        round(budget_total / max(total_hours_in_interval - total_budget_shutdown_hours, 3), 3)
+        if budget_total > 0 else 0
+    )
+    hourly_forecast_with_shutdown = (
+        round(forecast_total / max(total_hours_in_interval - total_forecast_shutdown_hours, 3), 3)
+        if forecast_total > 0 else 0
+    )
+
+    print(f"Budget hourly value with shutdown: {hourly_budget_with_shutdown}")
+    print(f"Forecast hourly value with shutdown: {hourly_forecast_with_shutdown}")
+
+    # Daily calendar joined with the shutdown hours per day
+    print("Calculating daily values with shutdown hours...")
+    daily_values = _allocate_daily_values(
+        start_date, end_date, shutdown_data,
+        hourly_budget_with_shutdown, hourly_forecast_with_shutdown
+    )
+    print(daily_values)
+    return daily_values
+
+
+def _load_shutdown_data(conn, start_date, end_date, version_name=None, as_of=None):
+    """
+    Retrieve the shutdown hours of the interval with NaN replaced by 0.
+
+    Raises:
+        ValueError: If no shutdown data was found.
+    """
+    # Retrieve shutdown hours for the date range and version
+    shutdown_data = get_shutdown_dates(conn, start_date, end_date, version_name=version_name, as_of=as_of)
+    if shutdown_data is None or shutdown_data.empty:
+        raise ValueError("No shutdown data found for the specified date range and version.")
+
+    # Replace NaN shutdown hours with 0
+    shutdown_data = shutdown_data.copy()
+    shutdown_data['budget_shutdown_hours'] = shutdown_data['budget_shutdown_hours'].fillna(0)
+    shutdown_data['forecast_shutdown_hours'] = shutdown_data['forecast_shutdown_hours'].fillna(0)
+
+    # Debug: Display filtered shutdown data
+    print("Debug: Filtered Shutdown Data within Date Range:")
+    print(shutdown_data)
+    return shutdown_data
+
+
+def _material_filter_mask(df, material_type=None, category=None, material_name=None):
+    """
+    Select the rows of a material filter spec in pandas, compared like SQL Server
+    (case-insensitive, trailing spaces ignored).
+
+    Returns:
+        pd.Series: Boolean mask.
+    """
+    mask = df['material_id'].notna()
+    for column, value in (('material_type', material_type), ('category', category), ('material_name', material_name)):
+        if value:
+            mask &= df[column].astype(str).str.rstrip().str.lower() == str(value).rstrip().lower()
+    return mask
+
+
+@cached_calculation
+def calculate_with_shutdown_batch(filters, start_date, end_date, version_name=None, as_of=None):
+    """
+    Calculate daily budget and forecast values considering shutdown hours for many material filters at once.
+    The shutdown hours and the fact data are loaded once, every filter is evaluated on them.
+
+    Args:
+        filters: List of filter specs (dicts with optional material_type, category and material_name keys,
+                 other keys are ignored).
         start_date: Start date of the calculation period.
         end_date: End date of the calculation period.
-        material_name: Specific material name.
-        category: Specific category.
         version_name: Specific version of the data to use.
+        as_of: Point in time whose values are used instead of a version (optional).
 
     Returns:
-        List of daily values with budget and forecast.
+        List aligned with filters: DataFrame (date, budget, forecast) per filter, None if the filter has
+        no budget and forecast values.
     """
     import pandas as pd
 
     conn = get_db_connection()
 
     try:
-        print(f"Starting calculation for material_type={material_type}, start_date={start_date}, end_date={end_date}, material_name={material_name}, category={category}, version_name={version_name}")
+        print(f"Starting batch calculation for {len(filters)} filters, start_date={start_date}, end_date={end_date}, version_name={version_name}")
+
+        shutdown_data = _load_shutdown_data(conn, start_date, end_date, version_name=version_name, as_of=as_of)
+
+        # One fact read for all filters
+        start = pd.to_datetime(start_date)
+        end = pd.to_datetime(end_date)
+        month_hours = _month_hours_table(start, end)
+        rows = _load_budget_forecast_rows(conn, month_hours, version_name=version_name, as_of=as_of)
+
+        results = []
+        for spec in filters:
+            selected = rows[_material_filter_mask(
+                rows, spec.get("material_type"), spec.get("category"), spec.get("material_name")
+            )]
+            try:
+                budget_total, forecast_total = _budget_forecast_totals(selected, start, end, month_hours)
+            except ValueError as e:
+                print(f"Error calculating material budget and forecast for {spec}: {e}")
+                budget_total, forecast_total = 0, 0
+
+            try:
+                results.append(
+                    _daily_values_from_totals(start_date, end_date, shutdown_data, budget_total, forecast_total)
+                )
+            except ValueError as e:
+                print(f"Error during calculation for {spec}: {e}")
+                results.append(None)
+
+        print("Batch daily values calculated successfully.")
+        return results
 
-        # Retrieve shutdown hours for the date range and version
-        shutdown_data = get_shutdown_dates(conn, start_date, end_date, version_name=version_name)
-        if shutdown_data is None or shutdown_data.empty:
-            raise ValueError("No shutdown data found for the specified date range and version.")
+    finally:
+        conn.close()
+        print("Database connection closed.")
 
-        # Replace NaN shutdown hours with 0
-        shutdown_data['budget_shutdown_hours'] = shutdown_data['budget_shutdown_hours'].fillna(0)
-        shutdown_data['forecast_shutdown_hours'] = shutdown_data['forecast_shutdown_hours'].fillna(0)
 
-        # Debug: Display filtered shutdown data
-        print("Debug: Filtered Shutdown Data within Date Range:")
-        print(shutdown_data)
+def _material_name_key(material_names):
+    """
+    Normalize material names for grouping like SQL Server compares them (case-insensitive, trailing spaces ignored).
+    """
+    return material_names.str.rstrip().str.lower()
+
+
+def _material_name_totals(rows, start_date, end_date, month_hours):
+    """
+    Prorate the budget and forecast rows to the interval and sum them per material name.
+    A scenario without stored cells counts as 0 (delta loads do not store zero cells).
 
-        # Sum shutdown hours within the date range
-        total_budget_shutdown_hours = shutdown_data['budget_shutdown_hours'].sum()
-        total_forecast_shutdown_hours = shutdown_data['forecast_shutdown_hours'].sum()
+    Args:
+        rows: Rows from _load_budget_forecast_rows.
+        start_date (pd.Timestamp): Start of the interval.
+        end_date (pd.Timestamp): End of the interval.
+        month_hours: Month-hours table of the interval.
+
+    Returns:
+        DataFrame indexed by the normalized material name with total_budget and total_forecast,
+        materials without budget and forecast in the interval are dropped.
+    """
+    rows = rows.assign(material_id=_material_name_key(rows['material_name']))
+    totals = _prorate_monthly_values(rows, start_date, end_date, month_hours).set_index('material_id')
+    totals = totals.reindex(columns=['total_budget', 'total_forecast'], fill_value=0).astype(float).round(3)
+    return totals[(totals['total_budget'] != 0) | (totals['total_forecast'] != 0)]
 
-        # Debug: Display summed shutdown hours
-        print(f"Total budget shutdown hours in date range: {total_budget_shutdown_hours}")
-        print(f"Total forecast shutdown hours in date range: {total_forecast_shutdown_hours}")
+
+@cached_calculation
+def calculate_daily_values_by_material(start_date, end_date, version_name=None, as_of=None):
+    """
+    Calculate daily budget and forecast values considering shutdown hours for every material in one computation
+    (material x day matrix). The shutdown calendar and the fact data are read once.
+    Materials with the same name share their values, like calculate_with_shutdown_from_db(material_name=...).
+
+    Args:
+        start_date: Start date of the calculation period.
+        end_date: End date of the calculation period.
+        version_name: Specific version of the data to use.
+        as_of: Point in time whose values are used instead of a version (optional).
+
+    Returns:
+        DataFrame with one row per material and day: date, dim_material_id, material_name, budget and forecast.
+        Materials without budget and forecast values are not included.
+    """
+    import pandas as pd
+
+    result_columns = ['date', 'dim_material_id', 'material_name', 'budget', 'forecast']
+
+    conn = get_db_connection()
+    try:
+        shutdown_data = _load_shutdown_data(conn, start_date, end_date, version_name=version_name, as_of=as_of)
+
+        start = pd.to_datetime(start_date)
+        end = pd.to_datetime(end_date)
+        month_hours = _month_hours_table(start, end)
+        rows = _load_budget_forecast_rows(conn, month_hours, version_name=version_name, as_of=as_of)
+        materials = pd.read_sql_query("SELECT dim_material_id, material_name FROM dim_material", conn)
+    finally:
+        conn.close()
+        print("Database connection closed.")
+
+    totals = _material_name_totals(rows, start, end, month_hours)
+    if totals.empty:
+        return pd.DataFrame(columns=result_columns)
+
+    # Hourly values per material over the working hours of the interval
+    total_hours_in_interval = ((end - start).days + 1) * 24
+    budget_hours = max(total_hours_in_interval - shutdown_data['budget_shutdown_hours'].sum(), 3)
+    forecast_hours = max(total_hours_in_interval - shutdown_data['forecast_shutdown_hours'].sum(), 3)
+    hourly_budget = (totals['total_budget'] / budget_hours).round(3).where(totals['total_budget'] > 0, 0)
+    hourly_forecast = (totals['total_forecast'] / forecast_hours).round(3).where(totals['total_forecast'] > 0, 0)
+
+    # Material x day matrices: working hours of the day times the hourly value of the material
+    daily = _daily_working_hours(start_date, end_date, shutdown_data)
+    budget = pd.DataFrame(
+        daily['budget_hours'].to_numpy()[:, None] * hourly_budget.to_numpy()[None, :],
+        index=daily['date'], columns=totals.index
+    ).round(3)
+    forecast = pd.DataFrame(
+        daily['forecast_hours'].to_numpy()[:, None] * hourly_forecast.to_numpy()[None, :],
+        index=daily['date'], columns=totals.index
+    ).round(3)
+
+    values = pd.concat({'budget': budget.stack(), 'forecast': forecast.stack()}, axis=1).reset_index()
+    materials['material_id'] = _material_name_key(materials['material_name'])
+    result = materials.merge(values, on='material_id')
+    print(f"Daily values calculated for {result['dim_material_id'].nunique()} materials.")
+    return result[result_columns]
+
+
+@cached_calculation
+def calculate_with_shutdown_from_db(material_type=None, start_date=None, end_date=None, material_name=None, category=None, version_name=None, as_of=None):
+    """
+    Calculate daily budget and forecast values considering shutdown hours.
+
+    Args:
+        material_type: Filter by material type.
+        start_date: Start date of the calculation period.
+        end_date: End date of the calculation period.
+        material_name: Specific material name.
+        category: Specific category.
+        version_name: Specific version of the data to use.
+        as_of: Point in time whose values are used instead of a version (optional).
+
+    Returns:
+        DataFrame with one row per day: date, budget and forecast.
+    """
+    conn = get_db_connection()
+
+    try:
+        print(f"Starting calculation for material_type={material_type}, start_date={start_date}, end_date={end_date}, material_name={material_name}, category={category}, version_name={version_name}")
+
+        shutdown_data = _load_shutdown_data(conn, start_date, end_date, version_name=version_name, as_of=as_of)
 
         # Call calculate_total_budget_and_forecast to get the total monthly sums
         print("Calculating monthly totals using calculate_total_budget_and_forecast...")
@@ -357,70 +744,14 @@ def calculate_with_shutdown_from_db(material_type=None, start_date=None, end_dat
             material_name=material_name,
             material_type=material_type,
             category=category,
-            version_name=version_name
+            version_name=version_name,
+            as_of=as_of
         )
 
         # Unpack the tuple returned by calculate_total_budget_and_forecast
         budget_total, forecast_total = monthly_totals
 
-        # Round the totals to the nearest integer
-        budget_total = round(budget_total,3)
-        forecast_total = round(forecast_total,3)
-
-        print(f"Budget total: {budget_total}")
-        print(f"Forecast total: {forecast_total}")
-
-        if budget_total == 0 and forecast_total == 0:
-            raise ValueError("Both budget and forecast totals are invalid; cannot proceed.")
-
-        # Get the total hours in the interval
-        total_hours_in_interval = ((pd.to_datetime(end_date) - pd.to_datetime(start_date)).days + 1) * 24
-        print(f"Total hours in interval: {total_hours_in_interval}")
-
-        # Calculate hourly values with shutdown
-        hourly_budget_with_shutdown = (
-            round(budget_total / max(total_hours_in_interval - total_budget_shutdown_hours, 3), 3)
-            if budget_total > 0 else 0
-        )
-        hourly_forecast_with_shutdown = (
-            round(forecast_total / max(total_hours_in_interval - total_forecast_shutdown_hours, 3), 3)
-            if forecast_total > 0 else 0
-        )
-
-        print(f"Budget hourly value with shutdown: {hourly_budget_with_shutdown}")
-        print(f"Forecast hourly value with shutdown: {hourly_forecast_with_shutdown}")
-
-        # Daily values
-        daily_values = []
-
-        # Iterate through each day in the interval
-        print("Calculating daily values with shutdown hours...")
-        for single_date in pd.date_range(start=start_date, end=end_date):
-            # Initialize daily values
-            daily_budget_value = 0
-            daily_forecast_value = 0
-
-            # Budget calculations
-            budget_shutdown_hours = shutdown_data.loc[shutdown_data['date'] == single_date, 'budget_shutdown_hours'].sum()
-            hours_worked_budget = max(24 - budget_shutdown_hours, 0)
-            if budget_total > 0:
-                daily_budget_value = round((hours_worked_budget * hourly_budget_with_shutdown), 3)
-
-            # Forecast calculations
-            forecast_shutdown_hours = shutdown_data.loc[shutdown_data['date'] == single_date, 'forecast_shutdown_hours'].sum()
-            hours_worked_forecast = max(24 - forecast_shutdown_hours, 0)
-            if forecast_total > 0:
-                daily_forecast_value = round((hours_worked_forecast * hourly_forecast_with_shutdown), 3)
-
-            print(f"Daily budget value for {single_date.strftime('%Y-%m-%d')}: {daily_budget_value}")
-            print(f"Daily forecast value for {single_date.strftime('%Y-%m-%d')}: {daily_forecast_value}")
-
-            # Append daily values
-            daily_values.append({
-                'date': single_date.strftime('%Y-%m-%d'),
-                'budget': daily_budget_value,
-                'forecast': daily_forecast_value
-            })
+        daily_values = _daily_values_from_totals(start_date, end_date, shutdown_data, budget_total, forecast_total)
 
         print("Daily values calculated successfully.")
 
@@ -1,59 +1,91 @@
 import glob
+import hashlib
 import os
 
+import numpy as np
 import pandas as pd
 import datetime
-import math
 from file_paths import path_KSReport
 
 import db_config
+from Interface1WT.src.ks_report import KSReport
+from Interface1WT.src.material_keys import (
+    is_valid_material_id,
+    classify_material_type,
+    parse_month_headers,
+    month_column_name,
+)
+
+
+# In-process calendar key cache: (year, month, day) -> dim_time_id.
+# Monthly budget/forecast rows are stored with day=0, shutdown rows with the calendar day.
+# Refreshed by load_dim_time_calendar.
+_dim_time_cache = {}
+
+
+def refresh_dim_time_cache(cursor):
+    """
+    Load all dim_time keys into the in-process calendar cache.
+    Must be called again after new rows were merged into dim_time.
+
+    Args:
+        cursor: Database cursor for executing SQL.
+
+    Returns:
+        int: Number of cached time keys.
+    """
+    cursor.execute("SELECT year, month, day, dim_time_id FROM dim_time ORDER BY dim_time_id")
+    _dim_time_cache.clear()
+    for year, month, day, time_id in cursor.fetchall():
+        _dim_time_cache.setdefault((year, month, day), time_id)
+
+    print(f"Cached {len(_dim_time_cache)} dim_time keys.")
+    return len(_dim_time_cache)
+
+
+def resolve_time_id(cursor, year, month, day=0):
+    """
+    Resolve a dim_time_id from the in-process calendar cache (loaded on first use).
+
+    Args:
+        cursor: Database cursor for executing SQL.
+        year (int): Calendar year.
+        month (int): Calendar month.
+        day (int): Calendar day, 0 for the monthly budget and forecast rows.
+
+    Returns:
+        dim_time_id or None
+    """
+    if not _dim_time_cache:
+        refresh_dim_time_cache(cursor)
+    return _dim_time_cache.get((int(year), int(month), int(day)))
 
 
 # Helper functions to load the material table:
-def extract_material_df(file_path):
+def extract_material_df(report):
     """
-    Extract and classify material data from an Excel file based on Rohstoffnummer validation and classification.
+    Extract and classify material data from the KS report based on Rohstoffnummer validation and classification.
     Args:
-        file_path (str): Path to the Excel file.
+        report (KSReport): Parsed KS report workbook.
 
     Returns:
         pd.DataFrame: DataFrame with dim_material_id, material_name, material_type, and category.
     """
-    # Read the Excel file (sheet "Cons_Budget")
-    df = pd.read_excel(file_path, sheet_name="Cons_Budget", dtype=str)
+    # Sheet "Cons_Budget" with all cells as str
+    df = report.sheet("Cons_Budget", as_str=True)
 
     # Rename columns for clarity
     df.columns = ['material_name', 'dim_material_id', 'Dummy', 'category'] + list(df.columns[4:])
     df = df.drop(columns=['Dummy'])  # Drop unnecessary column
 
-    # Function to validate dim_material_id
-    def is_valid_rohstoffnummer(value):
-        if pd.isna(value):
-            return False
-        value = str(value)
-        return (value.isdigit() and len(value) == 7 and value.startswith("1")) or \
-               ("-b" in value and len(value.split('-')[0]) == 7) or \
-               ("-H1" in value and len(value.split('-')[0]) == 7) or \
-               ("-H2" in value and len(value.split('-')[0]) == 7)
-
     # Filter valid rows
-    valid_rows = df[df['dim_material_id'].apply(is_valid_rohstoffnummer)].copy()
+    valid_rows = df[is_valid_material_id(df['dim_material_id'])].copy()
 
     # Drop duplicate rows
     valid_rows = valid_rows.drop_duplicates()
 
-    # Material type classification
-    def classify_material_type(rohstoff_id):
-        rohstoff_id = str(rohstoff_id)
-        if rohstoff_id.startswith("11"):
-            return "Cons"
-        elif rohstoff_id.startswith("121"):
-            return "Paste"
-        else:
-            return "Others"
-
     # Add material_type column
-    valid_rows['material_type'] = valid_rows['dim_material_id'].apply(classify_material_type)
+    valid_rows['material_type'] = classify_material_type(valid_rows['dim_material_id'])
 
     # Reorder columns to match the desired order
     df_final = valid_rows[['dim_material_id', 'material_name', 'material_type', 'category']]
@@ -67,32 +99,26 @@ def extract_material_df(file_path):
 
 
 # Helper functions to load shutdown hour data in  the fact table:
-def extract_shutdown_hours_df(file_path, years_to_load, is_budget=True):
+def extract_shutdown_hours_df(report, years_to_load, is_budget=True):
     """
-    Extract shutdown hours data from the Excel file, including year, month, and day,
-    specifically from the 'Help_FC' sheet.
+    Extract shutdown hours data from the KS report, including year, month, and day,
+    from the 'Help' (budget) or 'Help_FC' (forecast) sheet.
 
     Args:
-        file_path (str): Path to the Excel file.
+        report (KSReport): Parsed KS report workbook.
         years_to_load (list): List of years (int) to filter the data.
 
     Returns:
         pd.DataFrame: DataFrame with year, month, day, and shutdown hours for the specified years.
     """
-    # Select the version sheet name baed on is_budget
-    version_sheet = "Cons_Forecast"
-
-    # Extract version name from the version sheet
-    version_df = pd.read_excel(file_path, sheet_name=version_sheet, dtype=str)
-
-    # Keep only the first column (Column A in Excel)
-    version_name = version_df.iloc[0, 0]
+    # Extract version name from the version sheet (Column A in 'Cons_Forecast')
+    version_name = report.version_name
 
     # Select the sheet name based on is_budget
     sheet_name = "Help" if is_budget else "Help_FC"
 
-    # Load the specified sheet from the Excel file
-    df = pd.read_excel(file_path, sheet_name=sheet_name, header=1)  # Adjust header to row 2 (0-based index)
+    # Take the specified sheet from the parsed report
+    df = report.sheet(sheet_name, header=1)  # Adjust header to row 2 (0-based index)
 
     # Select only the date and 'shutdown h' columns
     df = df.iloc[:, [0, 4]]  # Assuming the first column is 'date' and the fifth column is 'shutdown h'
@@ -131,69 +157,79 @@ def extract_shutdown_hours_df(file_path, years_to_load, is_budget=True):
     return shutdown_hours_df
 
 
-def process_shutdown_data(cursor, shutdown_df, is_budget=True):
+def resolve_shutdown_time_ids(cursor, shutdown_df):
     """
-    Processes and inserts shutdown hours data into the fact_table.
+    Resolve the dim_time_id of every shutdown day in memory from the calendar cache.
 
     Args:
         cursor: Database cursor for executing SQL.
-        shutdown_df (pd.DataFrame): DataFrame containing shutdown hours data.
-        is_budget (bool): If True, process as budget shutdown hours; if False, process as forecast shutdown hours.
+        shutdown_df (pd.DataFrame): DataFrame with year, month and day columns.
+
+    Returns:
+        pd.Series: dim_time_id per row (NaN for days that are missing in dim_time).
     """
-    # Determine the column names for shutdown hours
-    target_column = "bdgt_shutdown_hours" if is_budget else "fcst_shutdown_hours"
+    if not _dim_time_cache:
+        refresh_dim_time_cache(cursor)
 
-    # Ensure year, month, and day are integers
-    shutdown_df[['year', 'month', 'day']] = shutdown_df[['year', 'month', 'day']].astype(int)
+    days = shutdown_df[['year', 'month', 'day']].astype(int)
+    time_ids = [_dim_time_cache.get(key) for key in days.itertuples(index=False, name=None)]
+    return pd.Series(time_ids, index=shutdown_df.index, dtype=float)
 
-    for _, row in shutdown_df.iterrows():
-        shutdown_hours = row['shutdown h']
-        version_name = row["version_name"]
-        year, month, day = row['year'], row['month'], row['day']
 
-        # Fetch time_id
-        cursor.execute("SELECT dim_time_id FROM dim_time WHERE year = ? AND month = ? AND day = ?", (year, month, day))
-        time_id_result = cursor.fetchone()
+def process_shutdown_data(cursor, shutdown_df, is_budget=True):
+    """
+    Processes and inserts shutdown hours data into the fact_table in one batch.
 
-        if not time_id_result:
-            print(f"[ERROR] No dim_time_id for {day}-{month}-{year}")
-            continue
+    Args:
+        cursor: Database cursor for executing SQL.
+        shutdown_df (pd.DataFrame): DataFrame containing shutdown hours data.
+        is_budget (bool): If True, process as budget shutdown hours; if False, process as forecast shutdown hours.
 
-        time_id = time_id_result[0]
-
-        # Insert a new row into fact_table
-        print(
-            f"Inserting {target_column.upper()}: time_id={time_id}, shutdown_hours={shutdown_hours}, version_name={version_name}")
-        cursor.execute(
-            f"""
-                    INSERT INTO fact_table (material_id, time_id, version_name, bdgt_shutdown_hours, fcst_shutdown_hours, inserted_date)
-                    VALUES (NULL, ?, ?, ?, ?, GETDATE())
-                    """,
-            (time_id, version_name, shutdown_hours if is_budget else None, shutdown_hours if not is_budget else None)
-        )
+    Returns:
+        int: Number of inserted rows.
+    """
+    # Determine the scenario for shutdown hours
+    scenario = "budget_shutdown" if is_budget else "forecast_shutdown"
+
+    # Resolve all days at once
+    time_ids = resolve_shutdown_time_ids(cursor, shutdown_df)
+    missing_days = shutdown_df[time_ids.isna()]
+    for row in missing_days.itertuples(index=False):
+        print(f"[ERROR] No dim_time_id for {row.day}-{row.month}-{row.year}")
+
+    resolved = time_ids.notna()
+    shutdown_rows = pd.DataFrame({
+        'time_id': time_ids[resolved].astype(int),
+        'scenario': scenario,
+        'version_name': shutdown_df.loc[resolved, 'version_name'],
+        'value': shutdown_df.loc[resolved, 'shutdown h'],
+    })
+
+    query = """
+        INSERT INTO fact_table (material_id, time_id, scenario, version_name, value, inserted_date)
+        VALUES (NULL, ?, ?, ?, ?, GETDATE())
+        """
+    inserted_rows = bulk_insert(cursor, query, dataframe_to_rows(shutdown_rows))
+
+    print(f"Inserted {inserted_rows} {scenario.upper()} rows into fact_table.")
+    return inserted_rows
 
 
 # Helper functions to load budget and forecast data in  the fact table:
-def extract_bdgt_fcst_df(file_path, years_to_load, is_budget):
+def extract_bdgt_fcst_df(report, years_to_load, is_budget):
     """
     Extract and filter data for budget or forecast based on the input flag.
 
     Args:
-        file_path (str): Path to the Excel file.
+        report (KSReport): Parsed KS report workbook.
         years_to_load (list): List of years to extract, e.g., [2023, 2024].
         is_budget (bool): Flag to indicate whether to extract budget (True) or forecast (False).
 
     Returns:
         pd.DataFrame: Filtered DataFrame with renamed date columns and version.
     """
-    # Select the version sheet name based on is_budget
-    version_sheet = "Cons_Forecast"
-
-    # Extract version name from the version sheet
-    version_df = pd.read_excel(file_path, sheet_name=version_sheet, dtype=str)
-
-    # Keep only the first column (Column A in Excel)
-    version_name = version_df.iloc[0, 0]
+    # Extract version name from the version sheet (Column A in 'Cons_Forecast')
+    version_name = report.version_name
 
     # Select the correct sheet
     sheet_name = 'Cons_Budget' if is_budget else 'Cons_Forecast'
@@ -201,41 +237,22 @@ def extract_bdgt_fcst_df(file_path, years_to_load, is_budget):
     # Prefix for the column names
     prefix = "b_" if is_budget else "f_"
 
-    # Read the Excel file
-    df = pd.read_excel(file_path, sheet_name=sheet_name, dtype=str)
+    # Take the sheet with all cells as str
+    df = report.sheet(sheet_name, as_str=True)
 
     # Rename columns and drop unnecessary ones
     df.columns = ['Rohstoffname', 'Rohstoffnummer', 'Dummy', 'Kategorie'] + list(df.columns[4:])
     df = df.drop(columns=['Dummy'])
 
     # Filter valid rows based on Rohstoffnummer
-    def is_valid_rohstoffnummer(value):
-        if pd.isna(value):
-            return False
-        value = str(value)
-        return (value.isdigit() and len(value) == 7 and value.startswith("1")) or \
-            ("-b" in value and len(value.split('-')[0]) == 7) or \
-            ("-H1" in value and len(value.split('-')[0]) == 7) or \
-            ("-H2" in value and len(value.split('-')[0]) == 7)
-
-    valid_rows = df[df['Rohstoffnummer'].apply(is_valid_rohstoffnummer)].copy()
-
-    # Identify date columns and filter for specific years
-    date_columns = [
-        col for col in valid_rows.columns[4:]
-        if pd.to_datetime(col, errors='coerce', dayfirst=True).year in years_to_load
-    ]
+    valid_rows = df[is_valid_material_id(df['Rohstoffnummer'])].copy()
 
-    # Rename date columns with 'b_' or 'f_' prefix (e.g., 'b_jan_23', 'f_jan_23')
-    month_mapping = {
-        1: "jan", 2: "feb", 3: "mar", 4: "apr", 5: "may", 6: "jun",
-        7: "jul", 8: "aug", 9: "sep", 10: "oct", 11: "nov", 12: "dec"
-    }
+    # Identify date columns for the specific years (each header is parsed once)
+    month_headers = parse_month_headers(valid_rows.columns[4:], years_to_load)
 
+    # Rename date columns with 'b_' or 'f_' prefix (e.g., 'b_jan_23', 'f_jan_23')
     new_date_columns = {
-        col: f"{prefix}{month_mapping[pd.to_datetime(col, errors='coerce', dayfirst=True).month]}_"
-             f"{str(pd.to_datetime(col, errors='coerce', dayfirst=True).year)[2:]}"
-        for col in date_columns
+        col: month_column_name(prefix, month_start) for col, month_start in month_headers.items()
     }
 
     # Rename columns and filter relevant ones
@@ -256,9 +273,118 @@ def extract_bdgt_fcst_df(file_path, years_to_load, is_budget):
     return valid_rows_with_dates
 
 
+def dataframe_to_rows(df):
+    """
+    Convert a DataFrame into a list of tuples with native Python values (NaN -> None),
+    ready to be used as a pyodbc parameter array.
+
+    Args:
+        df (pd.DataFrame): DataFrame whose columns are in the order of the query parameters.
+
+    Returns:
+        list: List of row tuples.
+    """
+    df = df.astype(object)
+    df = df.where(pd.notna(df), None)
+    return [tuple(row) for row in df.itertuples(index=False, name=None)]
+
+
+def bulk_insert(cursor, query, rows):
+    """
+    Send all rows of an INSERT in one parameter array using pyodbc's fast_executemany.
+
+    Args:
+        cursor: Database cursor for executing SQL.
+        query (str): Parameterized INSERT statement.
+        rows (list): List of parameter tuples.
+
+    Returns:
+        int: Number of rows sent to the database.
+    """
+    if not rows:
+        return 0
+
+    previous_mode = cursor.fast_executemany
+    cursor.fast_executemany = True
+    try:
+        cursor.executemany(query, rows)
+    finally:
+        cursor.fast_executemany = previous_mode
+    return len(rows)
+
+
+def get_known_materials(cursor):
+    """
+    Retrieve all material IDs of dim_material with one query.
+
+    Args:
+        cursor: Database cursor for executing SQL.
+
+    Returns:
+        set: Material IDs.
+    """
+    cursor.execute("SELECT dim_material_id FROM dim_material")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def build_fact_rows(cursor, df, columns, month_mapping, is_budget=True):
+    """
+    Build all fact rows (one per material and month column) for a budget or forecast DataFrame.
+    The materials are resolved with one query and the time keys from the calendar cache.
+
+    Args:
+        cursor: Database cursor for executing SQL.
+        df (pd.DataFrame): DataFrame containing budget or forecast data.
+        columns (list): List of month column names to process (e.g. 'b_jan_23').
+        month_mapping (dict): Mapping of month abbreviations to integers.
+        is_budget (bool): Flag to indicate whether the rows are budget (True) or forecast (False) data.
+
+    Returns:
+        pd.DataFrame: DataFrame with material_id, time_id, scenario, version_name, column and value.
+    """
+    # Resolve the known materials once
+    known_materials = get_known_materials(cursor)
+
+    # Skip materials that are not in dim_material
+    unknown_materials = df.loc[~df['Rohstoffnummer'].isin(known_materials), 'Rohstoffnummer'].unique()
+    for material_id in unknown_materials:
+        print(f"Material ID {material_id} not found in dim_material. Skipping...")
+    df = df[df['Rohstoffnummer'].isin(known_materials)]
+
+    # One row per material and month column
+    fact_rows = df.melt(
+        id_vars=['Rohstoffnummer', 'Version'], value_vars=columns, var_name='column', value_name='raw_value'
+    ).rename(columns={'Rohstoffnummer': 'material_id', 'Version': 'version_name'})
+
+    # Map each month column to its dim_time_id
+    column_time_ids = {}
+    for col in columns:
+        _, month_abbr, year_suffix = col.split('_')
+        time_id = resolve_time_id(cursor, int(f"20{year_suffix}"), month_mapping[month_abbr])
+        if time_id is None:
+            print(f"No dim_time_id for {month_abbr}-20{year_suffix}")
+            continue
+        column_time_ids[col] = time_id
+    fact_rows['time_id'] = fact_rows['column'].map(column_time_ids)
+    fact_rows = fact_rows.dropna(subset=['time_id'])
+    fact_rows['time_id'] = fact_rows['time_id'].astype(int)
+
+    # Convert the values, empty cells are stored as 0
+    fact_rows['value'] = pd.to_numeric(fact_rows['raw_value'], errors='coerce')
+    invalid_rows = fact_rows[fact_rows['value'].isna() & fact_rows['raw_value'].notna()]
+    for _, row in invalid_rows.iterrows():
+        print(f"Error inserting {row['column']} for material_id={row['material_id']}: invalid value {row['raw_value']!r}")
+    fact_rows = fact_rows.drop(invalid_rows.index)
+    fact_rows['value'] = fact_rows['value'].fillna(0)
+    fact_rows['scenario'] = "budget" if is_budget else "forecast"
+
+    return fact_rows[['material_id', 'time_id', 'scenario', 'version_name', 'column', 'value']].reset_index(drop=True)
+
+
 def process_data(cursor, df, columns, month_mapping, is_budget=True):
     """
     Processes and inserts budget or forecast data into the fact_table.
+    All rows are built in memory first and written with one parameter array.
 
     Args:
         cursor: Database cursor for executing SQL.
@@ -269,44 +395,18 @@ def process_data(cursor, df, columns, month_mapping, is_budget=True):
     """
     data_type = "BUDGET" if is_budget else "FORECAST"
 
-    for _, row in df.iterrows():
-        material_id = row['Rohstoffnummer']
-        version_name = row['Version']
+    fact_rows = build_fact_rows(cursor, df, columns, month_mapping, is_budget=is_budget)
 
-        # Verify material_id exists in dim_material
-        cursor.execute("SELECT dim_material_id FROM dim_material WHERE dim_material_id = ?", (material_id,))
-        if not cursor.fetchone():
-            print(f"Material ID {material_id} not found in dim_material. Skipping...")
-            continue
+    query = """
+        INSERT INTO fact_table (material_id, time_id, scenario, version_name, value, inserted_date)
+        VALUES (?, ?, ?, ?, ?, GETDATE())
+        """
+    inserted_rows = bulk_insert(
+        cursor, query, dataframe_to_rows(fact_rows[['material_id', 'time_id', 'scenario', 'version_name', 'value']])
+    )
 
-        for col in columns:
-            try:
-                _, month_abbr, year_suffix = col.split('_')
-                month = month_mapping[month_abbr]
-                year = int(f"20{year_suffix}")
-
-                # Fetch time_id
-                cursor.execute("SELECT dim_time_id FROM dim_time WHERE year = ? AND month = ?", (year, month))
-                time_id_result = cursor.fetchone()
-                if not time_id_result:
-                    print(f"No dim_time_id for {month_abbr}-{year}")
-                    continue
-                time_id = time_id_result[0]
-
-                # Extract value
-                value = float(row[col]) if not pd.isna(row[col]) else 0
-
-                # Insert data into fact_table
-                print(f"Inserting {data_type}: material_id={material_id}, time_id={time_id}, version={version_name}, {col}={value}")
-                cursor.execute(
-                    f"""
-                    INSERT INTO fact_table (material_id, time_id, version_name, bdgt_shutdown_hours, fcst_shutdown_hours, {col}, inserted_date)
-                    VALUES (?, ?, ?, 0, 0, ?, GETDATE())
-                    """,
-                    (material_id, time_id, version_name, value)
-                )
-            except Exception as e:
-                print(f"Error inserting {col} for material_id={material_id}: {e}")
+    print(f"Inserted {inserted_rows} {data_type} rows into fact_table.")
+    return inserted_rows
 
 
 # Helper functions to check and detect changes the fact table:
@@ -327,8 +427,8 @@ def has_new_materials(cursor, df):
     :param df: DataFrame containing the source data
     :return: True if new materials exist, False otherwise
     """
-    # Fetch all material_ids from fact_table as strings
-    cursor.execute("SELECT DISTINCT material_id FROM fact_table")
+    # Fetch all material_ids with stored values as strings
+    cursor.execute("SELECT DISTINCT material_id FROM fact_current WHERE material_id IS NOT NULL")
     existing_materials = set(str(row[0]).strip() for row in cursor.fetchall() if row[0])
     print(f"Existing materials in database: {existing_materials}")
 
@@ -358,87 +458,123 @@ def get_dim_time_id(cursor, month_abbr, year_suffix):
     month = month_mapping[month_abbr]
     year = int(f"20{year_suffix}")
 
-    cursor.execute("SELECT dim_time_id FROM dim_time WHERE year = ? AND month = ?", (year, month))
-    result = cursor.fetchone()
-    return result[0] if result else None
+    return resolve_time_id(cursor, year, month)
 
 
-def get_latest_fact_data(cursor, material_id, time_id, column_name):
+def get_latest_fact_values(cursor, scenario):
     """
-    Retrieve the latest value for a specific material, time, and column in the fact table.
+    Retrieve the latest stored value per material and time for one scenario from fact_current.
 
     Args:
         cursor: Database cursor
-        material_id: Material ID to check
-        time_id: Time ID corresponding to year and month
-        column_name: Name of the column to check (e.g., 'b_jan_23', 'f_feb_24')
+        scenario: 'budget' or 'forecast'
 
     Returns:
-        Latest value for the column or None if no record exists.
+        pd.DataFrame: DataFrame with material_id, time_id, latest_value, latest_version and inserted_date.
     """
-    # Debug: Print inputs
-    print(f"Fetching latest data: material_id={material_id}, time_id={time_id}, column_name={column_name}")
+    result_columns = ['material_id', 'time_id', 'latest_value', 'latest_version', 'inserted_date']
 
-    # Debug: Print query
-    query = f"""
-           SELECT TOP 1 {column_name}
-           FROM fact_table
-           WHERE material_id = ? AND time_id = ? AND {column_name} IS NOT NULL
-           ORDER BY inserted_date DESC
-       """
-    print(f"Executing query: {query}")
+    # Newest value per cell from the current-state snapshot
+    query = """
+        SELECT material_id, time_id, value, version_name, inserted_date
+        FROM fact_current
+        WHERE scenario = ? AND material_id IS NOT NULL
+    """
+    cursor.execute(query, (scenario,))
+    rows = [tuple(row) for row in cursor.fetchall()]
 
-    try:
-        # Execute the query
-        cursor.execute(query, (material_id, time_id))
-        result = cursor.fetchone()
+    latest_df = pd.DataFrame.from_records(rows, columns=result_columns)
+    latest_df['material_id'] = latest_df['material_id'].astype(str).str.strip()
+    latest_df['latest_value'] = pd.to_numeric(latest_df['latest_value'], errors='coerce')
+    return latest_df
 
-        # Debug: Print query result
-        print(f"Query result: {result}")
 
-        # Return the result
-        return result[0] if result else None
-    except Exception as e:
-        print(f"[ERROR] Failed to fetch data: {e}")
-        return None
+def _isclose(a, b, rel_tol=1e-5):
+    """
+    Vectorized math.isclose for two aligned Series (relative tolerance only).
+    """
+    return (a - b).abs() <= rel_tol * np.maximum(a.abs(), b.abs())
 
 
-def get_latest_version(cursor, material_id, is_budget, month_columns):
+def detect_bdgt_fcst_changes(cursor, df_new, is_budget=True):
     """
-    Retrieve the latest version in the fact table for a given material by identifying non-null budget or forecast values.
+    Compare the new input DataFrame with the latest fact table records in one pass.
 
     Args:
         cursor: Database cursor
-        material_id: Material ID
+        df_new: New DataFrame containing the budget or forecast data
         is_budget: True for budget data, False for forecast data
-        month_columns: List of all relevant month columns (e.g., ['b_jan_23', 'f_feb_23'])
 
     Returns:
-        Latest version string or None.
+        pd.DataFrame: Diff report with one row per detected change and the columns
+        material_id, column, time_id, change ('version', 'new', 'changed' or 'removed'),
+        latest_version, new_version, latest_value and current_value. Empty if nothing changed.
     """
-    # Filter the month columns for budget or forecast
     column_prefix = 'b_' if is_budget else 'f_'
-    relevant_columns = [col for col in month_columns if col.startswith(column_prefix)]
-
-    if not relevant_columns:
-        print(f"No relevant columns found for {'budget' if is_budget else 'forecast'} data.")
-        return None
-
-    # Construct the dynamic column checks
-    column_checks = " OR ".join([f"{col} IS NOT NULL" for col in relevant_columns])
-
-    # Query to find the latest version for budget or forecast data
-    query = f"""
-        SELECT TOP 1 version_name
-        FROM fact_table
-        WHERE material_id = ? 
-          AND ({column_checks})
-        ORDER BY inserted_date DESC
-    """
-    print(f"Executing query: {query}")  # Debugging query
-    cursor.execute(query, (material_id,))
-    result = cursor.fetchone()
-    return result[0] if result else None
+    month_columns = [col for col in df_new.columns if col.startswith(column_prefix)]
+
+    latest_df = get_latest_fact_values(cursor, "budget" if is_budget else "forecast")
+
+    # New data as one row per material and month column
+    new_df = df_new.melt(
+        id_vars=['Rohstoffnummer', 'Version'], value_vars=month_columns, var_name='column', value_name='current_value'
+    ).rename(columns={'Rohstoffnummer': 'material_id', 'Version': 'new_version'})
+    new_df['material_id'] = new_df['material_id'].astype(str).str.strip()
+    new_df['current_value'] = pd.to_numeric(new_df['current_value'], errors='coerce')
+
+    # Resolve time_id per month column, cells without time_id are skipped
+    column_time_ids = {}
+    for column in month_columns:
+        _, month_abbr, year_suffix = column.split('_')
+        column_time_ids[column] = get_dim_time_id(cursor, month_abbr, year_suffix)
+    skipped_columns = [column for column, time_id in column_time_ids.items() if time_id is None]
+    if skipped_columns:
+        print(f"  [SKIP] No time_id for columns: {skipped_columns}")
+    new_df['time_id'] = new_df['column'].map(column_time_ids)
+    new_df = new_df.dropna(subset=['time_id'])
+    new_df['time_id'] = new_df['time_id'].astype(int)
+
+    # 1. Version changes: latest stored version per material vs. new version
+    latest_versions = (
+        latest_df.sort_values('inserted_date')
+        .groupby('material_id')['latest_version'].last()
+    )
+    version_df = df_new[['Rohstoffnummer', 'Version']].drop_duplicates().rename(
+        columns={'Rohstoffnummer': 'material_id', 'Version': 'new_version'}
+    )
+    version_df['material_id'] = version_df['material_id'].astype(str).str.strip()
+    version_df['latest_version'] = version_df['material_id'].map(latest_versions)
+    version_changes = version_df[version_df['latest_version'] != version_df['new_version']].assign(change='version')
+
+    # 2. Value changes per cell, NULL and 0 are treated as equal.
+    # Stored cells that are missing in the new data count as empty (e.g. a material left the report).
+    cells = new_df.merge(
+        latest_df.drop(columns=['inserted_date']), on=['material_id', 'time_id'], how='outer'
+    )
+    time_id_columns = {time_id: column for column, time_id in column_time_ids.items() if time_id is not None}
+    cells['column'] = cells['column'].fillna(cells['time_id'].map(time_id_columns))
+    cells['new_version'] = cells['new_version'].fillna(df_new['Version'].iloc[0])
+    latest_value = cells['latest_value']
+    current_value = cells['current_value']
+
+    both_empty = (latest_value.isna() | (latest_value == 0)) & (current_value.isna() | (current_value == 0))
+    one_missing = latest_value.isna() != current_value.isna()
+    both_set_differ = latest_value.notna() & current_value.notna() & ~_isclose(latest_value, current_value)
+
+    value_changes = cells[~both_empty & (one_missing | both_set_differ)].copy()
+    value_changes['change'] = np.select(
+        [value_changes['latest_value'].isna(), value_changes['current_value'].isna()],
+        ['new', 'removed'],
+        default='changed'
+    )
+
+    report_columns = ['material_id', 'column', 'time_id', 'change', 'latest_version', 'new_version',
+                      'latest_value', 'current_value']
+    diff_report = pd.concat(
+        [version_changes.reindex(columns=report_columns), value_changes.reindex(columns=report_columns)],
+        ignore_index=True
+    )
+    return diff_report
 
 
 def has_version_or_value_changes(cursor, df_new, is_budget=True):
@@ -455,130 +591,168 @@ def has_version_or_value_changes(cursor, df_new, is_budget=True):
     """
     data_type = "Budget" if is_budget else "Forecast"
 
-    for _, row in df_new.iterrows():
-        material_id = row['Rohstoffnummer']
-        version_name = row['Version']
+    diff_report = detect_bdgt_fcst_changes(cursor, df_new, is_budget=is_budget)
 
-        print(f"Checking material_id: {material_id}, Version: {version_name}")
+    if diff_report.empty:
+        print(f"No changes detected in {data_type} data.")
+        return False
 
-        # Compare the new version with the latest version in the fact table
-        latest_version = get_latest_version(cursor, material_id, is_budget, df_new.columns)
+    print(f"  [CHANGE] {len(diff_report)} changes detected in {data_type} data:")
+    print(diff_report['change'].value_counts().to_string())
+    print(diff_report.to_string(max_rows=50))
+    return True
 
-        if latest_version != version_name:
-            print(f"  [CHANGE] Version change detected: latest_version={latest_version}, new_version={version_name}")
-            return True  # Version has changed
 
-        for column in df_new.columns:
-            if column.startswith('b_') if is_budget else column.startswith('f_'):
-                try:
-                    # Extract time_id (dim_time) from column name
-                    _, month_abbr, year_suffix = column.split('_')
-                    dim_time_id = get_dim_time_id(cursor, month_abbr, year_suffix)
+def process_data_delta(cursor, df_new, is_budget=True):
+    """
+    Insert only the budget or forecast cells that differ from the latest stored values under the new version.
+    Cells that are empty in the new data but set in the database are written as 0, so the new version
+    read through dbo.fact_version is complete.
 
-                    if dim_time_id is None:
-                        print(f"  [SKIP] No time_id for column: {column}")
-                        continue
+    Args:
+        cursor: Database cursor for executing SQL.
+        df_new (pd.DataFrame): DataFrame containing budget or forecast data.
+        is_budget (bool): Flag to indicate whether to process budget (True) or forecast (False) data.
 
-                    print(f"Checking: material_id={material_id}, dim_time_id={dim_time_id}, column={column}")
+    Returns:
+        int: Number of inserted rows.
+    """
+    data_type = "BUDGET" if is_budget else "FORECAST"
 
-                    # Get latest value from fact table
-                    latest_value = get_latest_fact_data(cursor, material_id, dim_time_id, column)
-                    current_value = float(row[column]) if not pd.isna(row[column]) else None
+    diff_report = detect_bdgt_fcst_changes(cursor, df_new, is_budget=is_budget)
+    changed_cells = diff_report[diff_report['change'] != 'version']
+
+    # Skip materials that are not in dim_material
+    known_materials = get_known_materials(cursor)
+    unknown_materials = changed_cells.loc[~changed_cells['material_id'].isin(known_materials), 'material_id'].unique()
+    for material_id in unknown_materials:
+        print(f"Material ID {material_id} not found in dim_material. Skipping...")
+    changed_cells = changed_cells[changed_cells['material_id'].isin(known_materials)]
+
+    delta_rows = pd.DataFrame({
+        'material_id': changed_cells['material_id'],
+        'time_id': changed_cells['time_id'].astype(int),
+        'scenario': "budget" if is_budget else "forecast",
+        'version_name': changed_cells['new_version'],
+        'value': changed_cells['current_value'].fillna(0),
+    })
 
-                    # Debug information
-                    print(f"  Comparing column={column} | latest_value={latest_value}, current_value={current_value}")
+    query = """
+        INSERT INTO fact_table (material_id, time_id, scenario, version_name, value, inserted_date)
+        VALUES (?, ?, ?, ?, ?, GETDATE())
+        """
+    inserted_rows = bulk_insert(cursor, query, dataframe_to_rows(delta_rows))
 
-                    # Compare the values
-                    if (latest_value is None or latest_value == 0) and (current_value is None or current_value == 0):
-                        print(f"  [INFO] Both values are NULL or 0. Skipping...")
-                        continue  # Treat NULL and 0 as equal
+    print(f"Inserted {inserted_rows} changed {data_type} cells into fact_table "
+          f"({changed_cells['change'].value_counts().to_dict()}).")
+    return inserted_rows
 
-                    if (latest_value is None and current_value is not None) or \
-                            (latest_value is not None and current_value is None) or \
-                            (latest_value is not None and current_value is not None and not math.isclose(
-                                float(latest_value), float(current_value), rel_tol=1e-5)):
-                        print(
-                            f"  [CHANGE] Detected in column={column}: latest_value={latest_value}, current_value={current_value}")
-                        return True  # Change detected
 
-                except Exception as e:
-                    print(f"  [ERROR] Error comparing values for column={column}: {e}")
+def get_latest_shutdown_hours(cursor, scenario):
+    """
+    Retrieve the latest stored shutdown hours per day for one scenario from fact_current.
 
-    print(f"No changes detected in {data_type} data.")
-    return False
+    Args:
+        cursor: Database cursor
+        scenario: 'budget_shutdown' or 'forecast_shutdown'
+
+    Returns:
+        pd.DataFrame: DataFrame with time_id, latest_value and latest_version.
+    """
+    query = """
+        SELECT time_id, value, version_name
+        FROM fact_current
+        WHERE scenario = ? AND material_id IS NULL
+    """
+    cursor.execute(query, (scenario,))
+    rows = [tuple(row) for row in cursor.fetchall()]
 
+    latest_df = pd.DataFrame.from_records(rows, columns=['time_id', 'latest_value', 'latest_version'])
+    latest_df['latest_value'] = pd.to_numeric(latest_df['latest_value'], errors='coerce')
+    return latest_df
 
-def has_shutdown_hours_changes(cursor, shutdown_df):
+
+def detect_shutdown_hours_changes(cursor, shutdown_df, is_budget=True):
     """
-    Compare the new shutdown hours DataFrame with the latest fact table records to detect changes.
+    Compare the new shutdown hours with the latest stored values of the same scenario in one pass.
 
     Args:
         cursor: Database cursor
         shutdown_df: New DataFrame containing the shutdown hours data
+        is_budget: True for budget shutdown hours ('Help'), False for forecast shutdown hours ('Help_FC')
 
     Returns:
-        True if changes are detected or new rows are found, False otherwise.
+        pd.DataFrame: Changed dates with the columns date, time_id, change ('new' or 'changed'),
+        latest_value and current_value. Empty if nothing changed.
     """
-    print("Checking for changes or new entries in shutdown hours data.")
+    scenario = "budget_shutdown" if is_budget else "forecast_shutdown"
 
-    for _, row in shutdown_df.iterrows():
-        year, month, day = row['year'], row['month'], row['day']
-        shutdown_hours_new = row['shutdown h']
+    new_df = shutdown_df[['year', 'month', 'day']].astype(int)
+    new_df['current_value'] = pd.to_numeric(shutdown_df['shutdown h'], errors='coerce')
+    new_df['time_id'] = resolve_shutdown_time_ids(cursor, shutdown_df)
 
-        # Fetch time_id
-        cursor.execute("SELECT dim_time_id FROM dim_time WHERE year = ? AND month = ? AND day = ?", (year, month, day))
-        time_id_result = cursor.fetchone()
-        if not time_id_result:
-            print(f"[SKIP] No dim_time_id for {day}-{month}-{year}. This date might be missing in dim_time.")
-            continue
+    missing_days = new_df[new_df['time_id'].isna()]
+    for row in missing_days.itertuples(index=False):
+        print(f"[SKIP] No dim_time_id for {row.day}-{row.month}-{row.year}. This date might be missing in dim_time.")
+    new_df = new_df.dropna(subset=['time_id'])
+    new_df['time_id'] = new_df['time_id'].astype(int)
 
-        time_id = time_id_result[0]
+    cells = new_df.merge(get_latest_shutdown_hours(cursor, scenario), on='time_id', how='left')
+    latest_value = cells['latest_value']
+    current_value = cells['current_value']
 
-        # Fetch shutdown hours for the time_id
-        cursor.execute(
-            """
-            SELECT shutdown_hours 
-            FROM fact_table
-            WHERE time_id = ? AND material_id IS NULL
-            """,
-            (time_id,)
-        )
-        shutdown_hours_latest = cursor.fetchone()
+    is_new = latest_value.isna()
+    is_changed = latest_value.notna() & ~_isclose(latest_value, current_value)
 
-        if not shutdown_hours_latest:
-            # New shutdown hours found for this date
-            print(f"[NEW ENTRY] Detected for {day}-{month}-{year}: new shutdown_hours={shutdown_hours_new}")
-            return True
+    changes = cells[is_new | is_changed].copy()
+    changes['change'] = np.where(changes['latest_value'].isna(), 'new', 'changed')
+    changes['date'] = pd.to_datetime(changes[['year', 'month', 'day']])
 
-        shutdown_hours_latest = shutdown_hours_latest[0]
+    return changes[['date', 'time_id', 'change', 'latest_value', 'current_value']].reset_index(drop=True)
 
-        # Compare the shutdown hours
-        if not math.isclose(shutdown_hours_latest, shutdown_hours_new, rel_tol=1e-5):
-            print(f"[CHANGE] Detected for {day}-{month}-{year}: latest={shutdown_hours_latest}, new={shutdown_hours_new}")
-            return True
 
-    print("No changes or new entries detected in shutdown hours data.")
-    return False
+def has_shutdown_hours_changes(cursor, shutdown_df, is_budget=True):
+    """
+    Compare the new shutdown hours DataFrame with the latest fact table records to detect changes.
+
+    Args:
+        cursor: Database cursor
+        shutdown_df: New DataFrame containing the shutdown hours data
+        is_budget: True for budget shutdown hours, False for forecast shutdown hours
+
+    Returns:
+        True if changes are detected or new rows are found, False otherwise.
+    """
+    print("Checking for changes or new entries in shutdown hours data.")
+
+    changes = detect_shutdown_hours_changes(cursor, shutdown_df, is_budget=is_budget)
+
+    if changes.empty:
+        print("No changes or new entries detected in shutdown hours data.")
+        return False
+
+    print(f"  [CHANGE] {len(changes)} changed dates in shutdown hours data:")
+    print(changes.to_string(max_rows=50))
+    return True
 
 
 def is_version_unique(cursor, version_name):
     """
-    Check if the version name is unique in the fact_table.
+    Check if the version name is not yet registered in dim_version (primary key lookup).
     Args:
         cursor: Database cursor
         version_name: The version name from the Excel file
     Returns:
         bool: True if the version name is unique, False otherwise
     """
-    cursor.execute("SELECT COUNT(*) FROM fact_table WHERE version_name = ?", (version_name,))
-    result = cursor.fetchone()
-    if result[0] > 0:
+    cursor.execute("SELECT 1 FROM dim_version WHERE version_name = ?", (version_name,))
+    if cursor.fetchone() is not None:
         print(f"[ERROR] Version name '{version_name}' already exists in the database.")
         return False
     return True
 
 
-def checker_function(cursor, bdgt_df_new, fcst_df_new, shutdown_df):
+def checker_function(cursor, bdgt_df_new, fcst_df_new, shutdown_df, fcst_shutdown_df=None):
     """
     Check if the fact_table is empty, has new materials, or if data has changed.
 
@@ -586,11 +760,18 @@ def checker_function(cursor, bdgt_df_new, fcst_df_new, shutdown_df):
         cursor: Database cursor
         bdgt_df_new: New budget DataFrame
         fcst_df_new: New forecast DataFrame
-        shutdown_df: New shutdown hours DataFrame
+        shutdown_df: New budget shutdown hours DataFrame
+        fcst_shutdown_df: New forecast shutdown hours DataFrame (optional)
 
     Returns:
         True if data should be inserted, False otherwise
     """
+    # Without valid materials there is nothing to load (e.g. old reports with 5-digit material IDs)
+    for scenario, df in (("budget", bdgt_df_new), ("forecast", fcst_df_new)):
+        if df.empty:
+            print(f"[SKIP] No valid materials found in the {scenario} data. Version is not loaded.")
+            return False
+
     # 0 Check if version names in the budget and forecast data are unique
     bdgt_version_name = bdgt_df_new['Version'].iloc[0]
     fcst_version_name = fcst_df_new['Version'].iloc[0]
@@ -628,19 +809,165 @@ def checker_function(cursor, bdgt_df_new, fcst_df_new, shutdown_df):
         print("Changes or new entries detected in shutdown hours data. Proceeding to insert updated data.")
         return True
 
+    if fcst_shutdown_df is not None and has_shutdown_hours_changes(cursor, fcst_shutdown_df, is_budget=False) is True:
+        print("Changes or new entries detected in forecast shutdown hours data. Proceeding to insert updated data.")
+        return True
+
     print("No changes detected. Skipping data insertion.")
     return False
 
 
+# Helper functions for the KS report load ledger:
+def compute_file_fingerprint(file_path):
+    """
+    Compute the fingerprint of a source file without parsing it.
+
+    Args:
+        file_path (str): Path to the source file.
+
+    Returns:
+        dict: file_name, content_hash (SHA-256), file_size and file_mtime.
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+
+    stat = os.stat(file_path)
+    return {
+        "file_name": os.path.basename(file_path),
+        "content_hash": sha256.hexdigest(),
+        "file_size": stat.st_size,
+        "file_mtime": datetime.datetime.fromtimestamp(stat.st_mtime).replace(microsecond=0),
+    }
+
+
+def is_source_already_loaded(cursor, fingerprint):
+    """
+    Check if a file with the same content hash was already ingested.
+
+    Args:
+        cursor: Database cursor
+        fingerprint (dict): Fingerprint from compute_file_fingerprint.
+
+    Returns:
+        bool: True if the content hash is recorded in ks_load_ledger, False otherwise
+    """
+    cursor.execute(
+        "SELECT TOP 1 file_name, version_name, loaded_date FROM ks_load_ledger WHERE content_hash = ?",
+        (fingerprint["content_hash"],)
+    )
+    result = cursor.fetchone()
+    if result:
+        print(f"KS report '{fingerprint['file_name']}' is identical to '{result[0]}' "
+              f"(version '{result[1]}') loaded on {result[2]}.")
+        return True
+    return False
+
+
+def record_source_load(cursor, fingerprint, version_name, row_counts):
+    """
+    Record an ingested KS report in the ks_load_ledger table.
+
+    Args:
+        cursor: Database cursor
+        fingerprint (dict): Fingerprint from compute_file_fingerprint.
+        version_name (str): Version name of the report.
+        row_counts (dict): Extracted rows per data set (material_rows, budget_rows, forecast_rows, shutdown_rows).
+    """
+    cursor.execute(
+        """
+        INSERT INTO ks_load_ledger (file_name, content_hash, file_size, file_mtime, version_name,
+                                    material_rows, budget_rows, forecast_rows, shutdown_rows, loaded_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, GETDATE())
+        """,
+        (
+            fingerprint["file_name"], fingerprint["content_hash"], fingerprint["file_size"],
+            fingerprint["file_mtime"], version_name,
+            row_counts.get("material_rows"), row_counts.get("budget_rows"),
+            row_counts.get("forecast_rows"), row_counts.get("shutdown_rows")
+        )
+    )
+    print(f"Recorded KS report '{fingerprint['file_name']}' (version '{version_name}') in ks_load_ledger.")
+
+
 # Dimension table loader functions:
+def merge_material_table(cursor, material_df, table_name="dim_material"):
+    """
+    Upsert material master data with one bulk load into a staging table and one set-based MERGE.
+
+    Args:
+        cursor: Database cursor to execute SQL commands.
+        material_df (pd.DataFrame): DataFrame containing dim_material_id, material_name,
+                                    material_type, and category.
+        table_name (str): Target table, 'dim_material' or 'dim_material_2'.
+
+    Returns:
+        dict: Number of inserted, updated and unchanged materials.
+    """
+    # One staging row per material, the last occurrence wins (same as sequential upserts)
+    stage_df = material_df[['dim_material_id', 'material_name', 'material_type', 'category']]
+    stage_df = stage_df.drop_duplicates(subset=['dim_material_id'], keep='last')
+
+    cursor.execute("""
+        IF OBJECT_ID('tempdb..#material_stage') IS NOT NULL DROP TABLE #material_stage;
+        CREATE TABLE #material_stage (
+            dim_material_id VARCHAR(20) PRIMARY KEY,
+            material_name VARCHAR(100),
+            material_type VARCHAR(50),
+            category VARCHAR(10)
+        );
+    """)
+    bulk_insert(
+        cursor,
+        "INSERT INTO #material_stage (dim_material_id, material_name, material_type, category) VALUES (?, ?, ?, ?)",
+        dataframe_to_rows(stage_df)
+    )
+
+    # Update only rows whose attributes differ (NULL-safe via EXCEPT)
+    cursor.execute(f"""
+        MERGE INTO {table_name} AS target
+        USING #material_stage AS source
+        ON target.dim_material_id = source.dim_material_id
+        WHEN MATCHED AND EXISTS (
+            SELECT source.material_name, source.material_type, source.category
+            EXCEPT
+            SELECT target.material_name, target.material_type, target.category
+        ) THEN
+            UPDATE SET
+                target.material_name = source.material_name,
+                target.material_type = source.material_type,
+                target.category = source.category
+        WHEN NOT MATCHED THEN
+            INSERT (dim_material_id, material_name, material_type, category)
+            VALUES (source.dim_material_id, source.material_name, source.material_type, source.category)
+        OUTPUT $action;
+    """)
+    actions = [row[0] for row in cursor.fetchall()]
+    cursor.execute("DROP TABLE #material_stage")
+
+    counts = {
+        "inserted": actions.count("INSERT"),
+        "updated": actions.count("UPDATE"),
+    }
+    counts["unchanged"] = len(stage_df) - counts["inserted"] - counts["updated"]
+
+    print(f"{table_name}: {counts['inserted']} inserted, {counts['updated']} updated, "
+          f"{counts['unchanged']} unchanged.")
+    return counts
+
+
 def load_dim_material_table(cursor, material_df):
     """
-    Load material data into the dim_material table using a MERGE query.
+    Load material data into the dim_material table using a staged, set-based MERGE.
 
     Args:
         cursor: Database cursor to execute SQL commands.
         material_df (pd.DataFrame): DataFrame containing dim_material_id, material_name,
                                     material_type, and category.
+
+    Returns:
+        dict: Number of inserted, updated and unchanged materials.
     """
     # Clean the DataFrame
     material_df = material_df.dropna(subset=['dim_material_id'])  # Drop rows with missing IDs
@@ -658,149 +985,196 @@ def load_dim_material_table(cursor, material_df):
             f"Invalid rows:\n{invalid_rows[['dim_material_id', 'material_name', 'material_type', 'category']]}"
         )
 
-    # Iterate through the cleaned material_df rows
-    for _, row in material_df.iterrows():
-        merge_query = """
-                MERGE INTO dim_material AS target
-                USING (VALUES (?, ?, ?, ?)) AS source (dim_material_id, material_name, material_type, category)
-                ON target.dim_material_id = source.dim_material_id
-                WHEN MATCHED THEN 
-                    UPDATE SET 
-                        target.material_name = source.material_name,
-                        target.material_type = source.material_type,
-                        target.category = source.category
-                WHEN NOT MATCHED THEN 
-                    INSERT (dim_material_id, material_name, material_type, category)
-                    VALUES (source.dim_material_id, source.material_name, source.material_type, source.category);
-            """
-
-        # Extract row values for the query
-        values = (
-            row['dim_material_id'],  # Primary Key
-            row['material_name'],    # Name
-            row['material_type'],    # Material Type
-            row['category']          # Category
-        )
-
-        try:
-            # Execute the query
-            cursor.execute(merge_query, values)
-        except Exception as e:
-            print(f"Error inserting row {row['dim_material_id']}: {e}")
+    counts = merge_material_table(cursor, material_df, table_name="dim_material")
 
     print(f"Successfully loaded {len(material_df)} material records into the database.")
+    return counts
 
 
-def load_dim_time_table_monthly(cursor, file_path, years_to_load):
+def load_dim_time_calendar(cursor, years_to_load):
     """
-    Load time data from an Excel file into dim_time table for budegt and forecast data.
+    Generate the complete calendar for the given years in dim_time with one set-based MERGE:
+    one row per day (shutdown hours) and one row per month with day=0 (budget and forecast data).
+    The workbook is not needed, quarter and (year, month, day) keys are computed in SQL.
 
     Args:
         cursor: Database cursor for executing SQL.
-        file_path: Path to the Excel file.
-        years_to_load: List of years to filter (e.g., [2023, 2024]).
-    """
-    sheet_name = "Cons_Budget"
-    df = pd.read_excel(file_path, sheet_name=sheet_name, nrows=1)
-
-    # Identify valid date columns (date-like headers)
-    date_columns = [
-        col for col in df.columns if isinstance(col, pd.Timestamp) or isinstance(col, datetime.datetime)
-    ]
+        years_to_load: List of years to generate (e.g., [2023, 2024]).
 
-    # Filter only columns corresponding to the specified years
-    date_columns = [col for col in date_columns if col.year in years_to_load]
-
-    # Convert columns to 'MM-YYYY' format
-    month_columns = [col.strftime('%m-%Y') for col in date_columns if not pd.isna(col)]
-
-    # Debugging Output
-    print(f"Detected month columns for years {years_to_load}:", month_columns)
-
-    time_data = []
-    for col in month_columns:
-        month, year = map(int, col.split('-'))  # Split 'MM-YYYY' into integers
-        quarter = (month - 1) // 3 + 1  # Calculate the quarter
-        time_data.append((year, quarter, month, 0))  # Static day=0 when loading budget and forecast data
-
-    # Insert or merge the extracted data into the dim_time table
-    for year, quarter, month, day in time_data:
-        cursor.execute(
-            """
-            MERGE INTO dim_time AS target
-            USING (SELECT ? AS year, ? AS quarter, ? AS month, ? AS day) AS source
-            ON target.year = source.year AND target.month = source.month
-            WHEN NOT MATCHED THEN
-                INSERT (year, quarter, month, day)
-                VALUES (source.year, source.quarter, source.month, source.day);
-            """,
-            (year, quarter, month, day)
+    Returns:
+        int: Number of new rows in dim_time.
+    """
+    first_day = datetime.date(min(years_to_load), 1, 1)
+    last_day = datetime.date(max(years_to_load), 12, 31)
+    year_placeholders = ", ".join(["?"] * len(years_to_load))
+
+    cursor.execute(
+        f"""
+        WITH days AS (
+            SELECT CAST(? AS DATE) AS calendar_date
+            UNION ALL
+            SELECT DATEADD(DAY, 1, calendar_date) FROM days WHERE calendar_date < CAST(? AS DATE)
+        ),
+        calendar AS (
+            SELECT YEAR(calendar_date) AS year, DATEPART(QUARTER, calendar_date) AS quarter,
+                   MONTH(calendar_date) AS month, DAY(calendar_date) AS day
+            FROM days
+            UNION ALL
+            SELECT YEAR(calendar_date), DATEPART(QUARTER, calendar_date), MONTH(calendar_date), 0
+            FROM days
+            WHERE DAY(calendar_date) = 1
         )
+        MERGE INTO dim_time AS target
+        USING (SELECT year, quarter, month, day FROM calendar WHERE year IN ({year_placeholders})) AS source
+        ON target.year = source.year AND target.month = source.month AND target.day = source.day
+        WHEN NOT MATCHED THEN
+            INSERT (year, quarter, month, day)
+            VALUES (source.year, source.quarter, source.month, source.day)
+        OPTION (MAXRECURSION 0);
+        """,
+        (first_day, last_day, *years_to_load)
+    )
+    inserted_rows = cursor.rowcount
+
+    print(f"Successfully loaded {inserted_rows} new time records for years {years_to_load} into dim_time.")
+
+    # Make the new keys visible to the loaders
+    refresh_dim_time_cache(cursor)
+    return inserted_rows
+
+
+def extract_fact_frames(report, years_to_load):
+    """
+    Extract the budget, forecast and both shutdown hours frames before the database phase.
+
+    Args:
+        report (KSReport): Parsed KS report workbook.
+        years_to_load (list): Years of data to extract.
 
-    print(f"Successfully loaded {len(time_data)} unique time records for years {years_to_load} into dim_time.")
+    Returns:
+        dict: DataFrames 'budget', 'forecast', 'budget_shutdown' and 'forecast_shutdown'.
+    """
+    return {
+        "budget": extract_bdgt_fcst_df(report, years_to_load, is_budget=True),
+        "forecast": extract_bdgt_fcst_df(report, years_to_load, is_budget=False),
+        "budget_shutdown": extract_shutdown_hours_df(report, years_to_load, is_budget=True),
+        "forecast_shutdown": extract_shutdown_hours_df(report, years_to_load, is_budget=False),
+    }
 
 
-def load_dim_time_daily(cursor, file_path, years_to_load):
+# Helper functions for the version registry:
+def summarize_version(frames):
     """
-    Load daily time data (shutdown hours) into dim_time table using the first column as the date.
+    Compute the scenario coverage and date span of a KS report from its extracted frames.
 
     Args:
-        cursor: Database cursor.
-        file_path: Path to the Excel file.
-        years_to_load: List of years to filter (e.g., [2023, 2024]).
+        frames (dict): DataFrames 'budget', 'forecast', 'budget_shutdown' and 'forecast_shutdown'.
+
+    Returns:
+        dict: has_budget, has_forecast, has_budget_shutdown, has_forecast_shutdown, first_date and last_date.
     """
-    # Load the sheet for shutdown hours
-    sheet_name = "Help_FC"  # Adjust if the sheet name differs
-    df = pd.read_excel(file_path, sheet_name=sheet_name, header=0)
+    month_columns = {
+        "budget": [col for col in frames["budget"].columns if col.startswith('b_')],
+        "forecast": [col for col in frames["forecast"].columns if col.startswith('f_')],
+    }
+
+    dates = []
+    for name, columns in month_columns.items():
+        if not frames[name].empty:
+            # 'b_jan_23' -> first and last day of January 2023
+            month_starts = pd.to_datetime([col[2:] for col in columns], format="%b_%y")
+            dates += list(month_starts) + list(month_starts + pd.offsets.MonthEnd(0))
+    for name in ("budget_shutdown", "forecast_shutdown"):
+        if not frames[name].empty:
+            dates += list(pd.to_datetime(frames[name][['year', 'month', 'day']]))
+
+    return {
+        "has_budget": not frames["budget"].empty and bool(month_columns["budget"]),
+        "has_forecast": not frames["forecast"].empty and bool(month_columns["forecast"]),
+        "has_budget_shutdown": not frames["budget_shutdown"].empty,
+        "has_forecast_shutdown": not frames["forecast_shutdown"].empty,
+        "first_date": min(dates).date() if dates else None,
+        "last_date": max(dates).date() if dates else None,
+    }
 
-    # Access the first column directly
-    date_column = df.iloc[:, 0]  # First column as date
 
-    # Drop rows where the first column is empty
-    df = df.dropna(subset=[df.columns[0]])
+def register_version(cursor, version_name, source_file, stats, written_rows):
+    """
+    Register a loaded version in dim_version. Must run after its fact rows were inserted,
+    loaded_at is the cutoff of dbo.fact_version.
 
-    # Parse the first column as dates
-    df["date"] = pd.to_datetime(df.iloc[:, 0], format="%d.%m.%Y", errors="coerce")
+    Args:
+        cursor: Database cursor for executing SQL.
+        version_name (str): Version name of the KS report.
+        source_file (str): Path of the KS report file.
+        stats (dict): Coverage and date span from summarize_version.
+        written_rows (dict): Inserted fact rows per scenario.
+    """
+    cursor.execute(
+        """
+        INSERT INTO dim_version (
+            version_name, source_file, loaded_at,
+            has_budget, has_forecast, has_budget_shutdown, has_forecast_shutdown,
+            first_date, last_date,
+            budget_rows, forecast_rows, budget_shutdown_rows, forecast_shutdown_rows
+        )
+        VALUES (?, ?, GETDATE(), ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            version_name, os.path.basename(source_file),
+            stats["has_budget"], stats["has_forecast"], stats["has_budget_shutdown"], stats["has_forecast_shutdown"],
+            stats["first_date"], stats["last_date"],
+            written_rows["budget"], written_rows["forecast"],
+            written_rows["budget_shutdown"], written_rows["forecast_shutdown"],
+        )
+    )
+    print(f"Registered version '{version_name}' in dim_version: {stats}, {written_rows}")
 
-    # Filter out rows with invalid dates
-    invalid_rows = df[df["date"].isna()]
-    if not invalid_rows.empty:
-        print(f"Skipping {len(invalid_rows)} rows with invalid or unparsable dates.")
-        df = df[~df["date"].isna()]  # Keep only rows with valid dates
 
-    # Extract year, month, and day
-    df["year"] = df["date"].dt.year
-    df["month"] = df["date"].dt.month
-    df["day"] = df["date"].dt.day
+def update_fact_current(cursor, version_name):
+    """
+    Apply the fact rows of a newly loaded version to the fact_current snapshot with one MERGE.
+    The version is the newest one, so its rows replace the stored values of their cells.
+    Runs in the load transaction, readers see the snapshot either before or after the whole load.
 
-    # Filter for the specified years
-    df_filtered = df[df["year"].isin(years_to_load)]
-
-    # Calculate quarter
-    df_filtered["quarter"] = (df_filtered["month"] - 1) // 3 + 1
-
-    # Convert to tuples
-    time_data = df_filtered[["year", "quarter", "month", "day"]].drop_duplicates().itertuples(index=False, name=None)
-
-    # Insert or merge into the dim_time table
-    for year, quarter, month, day in time_data:
-        cursor.execute(
-            """
-            MERGE INTO dim_time AS target
-            USING (SELECT ? AS year, ? AS quarter, ? AS month, ? AS day) AS source
-            ON target.year = source.year AND target.month = source.month AND target.day = source.day
-            WHEN NOT MATCHED THEN
-                INSERT (year, quarter, month, day)
-                VALUES (source.year, source.quarter, source.month, source.day);
-            """,
-            (year, quarter, month, day)
-        )
+    Args:
+        cursor: Database cursor for executing SQL.
+        version_name (str): Version whose fact rows were just inserted.
 
-    print(f"Successfully loaded {len(df_filtered)} daily time records into dim_time.")
+    Returns:
+        int: Number of inserted or updated snapshot rows.
+    """
+    merge_query = """
+        WITH version_rows AS (
+            SELECT material_id, time_id, scenario, version_name, value, inserted_date,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY scenario, material_id, time_id ORDER BY inserted_date DESC, id DESC
+                   ) AS rn
+            FROM fact_table
+            WHERE version_name = ?
+        )
+        MERGE fact_current AS target
+        USING (SELECT * FROM version_rows WHERE rn = 1) AS source
+        ON target.scenario = source.scenario
+           AND target.time_id = source.time_id
+           AND EXISTS (SELECT target.material_id INTERSECT SELECT source.material_id)
+        WHEN MATCHED THEN
+            UPDATE SET version_name = source.version_name,
+                       value = source.value,
+                       inserted_date = source.inserted_date
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT (material_id, time_id, scenario, version_name, value, inserted_date)
+            VALUES (source.material_id, source.time_id, source.scenario, source.version_name,
+                    source.value, source.inserted_date);
+    """
+    cursor.execute(merge_query, (version_name,))
+    updated_rows = cursor.rowcount
+    print(f"Updated {updated_rows} fact_current rows with version '{version_name}'.")
+    return updated_rows
 
 
 # Fact table loader function:
-def load_fact_table(cursor, file_path, years_to_load):
+def load_fact_table(cursor, report, years_to_load, delta=True):
     """
     Load fact_table only if conditions are met.
     Budget and Forecast data are in a monthly basis and have the same structure.
@@ -808,16 +1182,21 @@ def load_fact_table(cursor, file_path, years_to_load):
 
     Args:
         cursor: Database cursor
-        file_path: Path to the source Excel file
+        report (KSReport): Parsed KS report workbook
         years_to_load: Years of data to load
-    """
-    # Extract Budget and Forecast original data
-    bdgt_df = extract_bdgt_fcst_df(file_path, years_to_load, is_budget=True)
-    fcst_df = extract_bdgt_fcst_df(file_path, years_to_load, is_budget=False)
+        delta (bool): If True, only budget and forecast cells that changed against the latest stored
+                      values are written under the new version (read complete versions via dbo.fact_version).
+                      If False, the whole report is written.
 
-    # Extract Shutdown Hours data separately for budget and forecast
-    bdgt_shutdown_df = extract_shutdown_hours_df(file_path, years_to_load, is_budget=True)
-    fcst_shutdown_df = extract_shutdown_hours_df(file_path, years_to_load, is_budget=False)
+    Returns:
+        dict: Number of extracted budget, forecast and shutdown rows and whether the data was loaded ("loaded").
+    """
+    # Extract Budget, Forecast and the Shutdown Hours data (budget and forecast)
+    frames = extract_fact_frames(report, years_to_load)
+    bdgt_df = frames["budget"]
+    fcst_df = frames["forecast"]
+    bdgt_shutdown_df = frames["budget_shutdown"]
+    fcst_shutdown_df = frames["forecast_shutdown"]
 
     # Month abbreviation mapping
     month_mapping = {
@@ -834,23 +1213,85 @@ def load_fact_table(cursor, file_path, years_to_load):
     df_forecast_filtered = fcst_df.loc[:, ['Rohstoffnummer', 'Version'] + fcst_value_columns]
 
     # Check if conditions are met to load data
-    load_conditions = checker_function(cursor, df_budget_filtered, df_forecast_filtered, bdgt_shutdown_df)
+    load_conditions = checker_function(
+        cursor, df_budget_filtered, df_forecast_filtered, bdgt_shutdown_df, fcst_shutdown_df
+    )
 
     if load_conditions:
-        # Process Budget Data
-        process_data(cursor, df_budget_filtered, bdgt_value_columns, month_mapping, is_budget=True)
+        written_rows = {}
+        if delta:
+            # Process only the changed Budget and Forecast cells
+            written_rows["budget"] = process_data_delta(cursor, df_budget_filtered, is_budget=True)
+            written_rows["forecast"] = process_data_delta(cursor, df_forecast_filtered, is_budget=False)
+        else:
+            # Process Budget Data
+            written_rows["budget"] = process_data(
+                cursor, df_budget_filtered, bdgt_value_columns, month_mapping, is_budget=True
+            )
 
-        # Process Forecast Data
-        process_data(cursor, df_forecast_filtered, fcst_value_columns, month_mapping, is_budget=False)
+            # Process Forecast Data
+            written_rows["forecast"] = process_data(
+                cursor, df_forecast_filtered, fcst_value_columns, month_mapping, is_budget=False
+            )
 
         # Process Shutdown Hours Data
-        process_shutdown_data(cursor, bdgt_shutdown_df, is_budget=True)
-        process_shutdown_data(cursor, fcst_shutdown_df, is_budget=False)
+        written_rows["budget_shutdown"] = process_shutdown_data(cursor, bdgt_shutdown_df, is_budget=True)
+        written_rows["forecast_shutdown"] = process_shutdown_data(cursor, fcst_shutdown_df, is_budget=False)
+
+        # Register the version with its statistics
+        register_version(cursor, report.version_name, report.file_path, summarize_version(frames), written_rows)
+
+        # Refresh the current-state snapshot
+        update_fact_current(cursor, report.version_name)
 
         print("Fact table successfully updated with Budget, Forecast, and Shutdown Hours data.")
     else:
         print("No data inserted. Conditions not met.")
 
+    return {
+        "budget_rows": len(bdgt_df),
+        "forecast_rows": len(fcst_df),
+        "shutdown_rows": len(bdgt_shutdown_df) + len(fcst_shutdown_df),
+        "loaded": bool(load_conditions),
+    }
+
+
+# Years of budget, forecast and shutdown data that are loaded from the KS reports
+YEARS_TO_LOAD = [2023, 2024, 2025, 2026, 2027, 2028]
+
+
+def load_ks_report(cursor, report, fingerprint, years_to_load=YEARS_TO_LOAD):
+    """
+    Load one parsed KS report: materials, fact rows of its version and the load ledger entry.
+    The file is only recorded in the ledger if its fact data was loaded, so a rejected file
+    (existing version, no changes) is checked again on the next run.
+    dim_time must already cover years_to_load (see load_dim_time_calendar).
+
+    Args:
+        cursor: Database cursor
+        report (KSReport): Parsed KS report workbook
+        fingerprint (dict): Fingerprint of the report file from compute_file_fingerprint
+        years_to_load: Years of data to load
+
+    Returns:
+        dict: Number of extracted material, budget, forecast and shutdown rows and whether the
+              fact data was loaded ("loaded").
+    """
+    # Extract and load material data
+    material_df = extract_material_df(report)
+    load_dim_material_table(cursor, material_df)
+
+    row_counts = load_fact_table(cursor, report, years_to_load)
+
+    row_counts["material_rows"] = len(material_df)
+
+    # Record the ingested file in the load ledger only after a successful fact load
+    if row_counts["loaded"]:
+        record_source_load(cursor, fingerprint, report.version_name, row_counts)
+    else:
+        print(f"KS report '{fingerprint['file_name']}' not recorded in ks_load_ledger (no data loaded).")
+    return row_counts
+
 
 # Main function to load all tables:
 def load_tables():
@@ -860,28 +1301,18 @@ def load_tables():
         conn = db_config.get_db_connection()  # Establish database connection
         cursor = conn.cursor()  # Get database cursor
 
-        # File path and years to load
-        years_to_load = [2023, 2024, 2025, 2026, 2027, 2028]
-        file_path = path_KSReport
-
-        # Extract and load material data
-        material_df = extract_material_df(file_path)
-
-        # Extract budget and forecast data
-        bdgt_df = extract_bdgt_fcst_df(file_path, years_to_load, is_budget=True)
-        fcst_df = extract_bdgt_fcst_df(file_path, years_to_load, is_budget=False)
-
+        # Skip the run if this exact file was already ingested
+        fingerprint = compute_file_fingerprint(path_KSReport)
+        if is_source_already_loaded(cursor, fingerprint):
+            print("KS report unchanged since the last load. Skipping Interface1WT load.")
+            return
 
-        print("Budget DataFrame:")
-        print(bdgt_df.head())
-        print("Forecast DataFrame:")
-        print(fcst_df.head())
+        # The KS report (parsed only once)
+        report = KSReport(path_KSReport)
 
         # Load tables
-        load_dim_material_table(cursor, material_df)
-        load_dim_time_table_monthly(cursor, file_path, years_to_load)
-        load_dim_time_daily(cursor, file_path, years_to_load)
-        load_fact_table(cursor, file_path, years_to_load)
+        load_dim_time_calendar(cursor, YEARS_TO_LOAD)
+        load_ks_report(cursor, report, fingerprint, YEARS_TO_LOAD)
 
         # Commit changes to the database
         conn.commit()
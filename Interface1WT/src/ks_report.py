@@ -0,0 +1,94 @@
+import pandas as pd
+
+from excel_reader import read_excel
+
+
+# Sheets of the KS report that are used by Interface1WT
+KS_REPORT_SHEETS = ["Cons_Budget", "Cons_Forecast", "Help", "Help_FC"]
+
+
+def _build_header(values):
+    """
+    Build column names from a raw header row the same way pd.read_excel does
+    (empty cells become 'Unnamed: i', duplicates get a '.n' suffix).
+
+    Args:
+        values (iterable): Raw cell values of the header row.
+
+    Returns:
+        list: Column names.
+    """
+    columns = []
+    seen = {}
+    for i, value in enumerate(values):
+        name = f"Unnamed: {i}" if pd.isna(value) or value == "" else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+class KSReport:
+    """
+    KS report workbook that is parsed only once per run.
+
+    The needed sheets are read as raw cell grids (no header, no type conversion) in a single pass.
+    The extract functions derive their DataFrames from these grids instead of opening the .xlsm again.
+    The engine is chosen by excel_reader.
+    """
+
+    def __init__(self, file_path, sheet_names=None):
+        """
+        Args:
+            file_path (str): Path to the KS report Excel file.
+            sheet_names (list): Sheets to parse, defaults to all sheets used by Interface1WT.
+        """
+        self.file_path = file_path
+        self.sheet_names = list(sheet_names or KS_REPORT_SHEETS)
+
+        print(f"Parsing KS report {file_path} (sheets: {self.sheet_names})...")
+        self._sheets = read_excel(file_path, sheet_name=self.sheet_names, header=None, dtype=object)
+
+    def header(self, sheet_name, header=0):
+        """
+        Return the column names of a sheet (same as reading it with nrows=1).
+
+        Args:
+            sheet_name (str): Name of the sheet.
+            header (int): Row (0-based, blank rows skipped) that holds the column names.
+
+        Returns:
+            list: Column names.
+        """
+        return _build_header(self._sheets[sheet_name].iloc[header])
+
+    def sheet(self, sheet_name, header=0, as_str=False):
+        """
+        Return a sheet as DataFrame, like pd.read_excel(file_path, sheet_name, header=header).
+
+        Args:
+            sheet_name (str): Name of the sheet.
+            header (int): Row (0-based, blank rows skipped) that holds the column names.
+            as_str (bool): Convert all non-empty cells to str (like dtype=str).
+
+        Returns:
+            pd.DataFrame: The sheet data below the header row.
+        """
+        raw = self._sheets[sheet_name]
+        df = raw.iloc[header + 1:].reset_index(drop=True)
+        df.columns = _build_header(raw.iloc[header])
+
+        if as_str:
+            return df.apply(lambda col: col.map(lambda value: value if pd.isna(value) else str(value)))
+        return df.infer_objects()
+
+    @property
+    def version_name(self):
+        """
+        Version name of the report (cell A2 of the 'Cons_Forecast' sheet).
+        """
+        value = self._sheets["Cons_Forecast"].iloc[1, 0]
+        return value if pd.isna(value) else str(value)
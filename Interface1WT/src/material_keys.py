@@ -0,0 +1,128 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# Valid Rohstoffnummer in the KS report: 7 digits starting with "1", or a 7-character base
+# followed by a "-b", "-H1" or "-H2" variant (e.g. "1101234", "1101234-b", "1101234-H1")
+VALID_MATERIAL_ID = re.compile(r"1\d{6}|[^-]{7}(?=-).*-(?:b|H1|H2).*", re.DOTALL)
+
+# Plain 7-digit material number (material master list)
+MATERIAL_NUMBER = re.compile(r"\d{7}")
+
+# Material number of the material master list -> dim_material_2 ID: the 3rd and 5th digit are dropped
+# (e.g. "2301000" -> "23100")
+MATERIAL_NUMBER_TRIM = re.compile(r"^(..).(.).")
+
+MONTH_ABBREVIATIONS = {
+    1: "jan", 2: "feb", 3: "mar", 4: "apr", 5: "may", 6: "jun",
+    7: "jul", 8: "aug", 9: "sep", 10: "oct", 11: "nov", 12: "dec"
+}
+
+
+def is_valid_material_id(material_ids):
+    """
+    Validate Rohstoffnummern of the KS report.
+
+    Args:
+        material_ids (pd.Series): Material IDs as str (NaN allowed).
+
+    Returns:
+        pd.Series: Boolean mask, True for valid IDs.
+    """
+    return material_ids.str.fullmatch(VALID_MATERIAL_ID, na=False)
+
+
+def is_material_number(material_ids):
+    """
+    Check for plain 7-digit material numbers.
+
+    Args:
+        material_ids (pd.Series): Material IDs as str (NaN allowed).
+
+    Returns:
+        pd.Series: Boolean mask, True for 7-digit numbers.
+    """
+    return material_ids.str.fullmatch(MATERIAL_NUMBER, na=False)
+
+
+def trim_material_number(material_ids):
+    """
+    Drop the 3rd and 5th digit of the material numbers of the material master list.
+
+    Args:
+        material_ids (pd.Series): Material IDs as str (NaN allowed).
+
+    Returns:
+        pd.Series: Trimmed material IDs.
+    """
+    return material_ids.str.replace(MATERIAL_NUMBER_TRIM, r"\1\2", regex=True)
+
+
+def find_trimmed_collisions(material_ids, trimmed_ids):
+    """
+    Find material numbers that are trimmed to the same ID (e.g. "5310020" and "5320120" -> "53020").
+
+    Args:
+        material_ids (pd.Series): Material IDs before trimming.
+        trimmed_ids (pd.Series): Trimmed material IDs (same index).
+
+    Returns:
+        dict: Trimmed ID -> list of the different source IDs in their input order,
+              empty if the trimmed IDs are unique.
+    """
+    pairs = pd.DataFrame({"source": material_ids, "trimmed": trimmed_ids}).dropna().drop_duplicates()
+    duplicated = pairs[pairs["trimmed"].duplicated(keep=False)]
+    return {trimmed: group["source"].tolist() for trimmed, group in duplicated.groupby("trimmed", sort=False)}
+
+
+def classify_material_type(material_ids):
+    """
+    Classify materials by their Rohstoffnummer: "11..." -> Cons, "121..." -> Paste, else Others.
+
+    Args:
+        material_ids (pd.Series): Material IDs as str.
+
+    Returns:
+        pd.Series: Material type per ID.
+    """
+    material_type = np.select(
+        [material_ids.str.startswith("11", na=False), material_ids.str.startswith("121", na=False)],
+        ["Cons", "Paste"],
+        default="Others"
+    )
+    return pd.Series(material_type, index=material_ids.index)
+
+
+def parse_month_headers(columns, years_to_load):
+    """
+    Parse the header dates of a KS report sheet once per column.
+
+    Args:
+        columns (iterable): Column names (datetime or str).
+        years_to_load (list): Years to keep, e.g., [2023, 2024].
+
+    Returns:
+        dict: Column name -> pd.Timestamp for the columns that fall into years_to_load.
+    """
+    month_headers = {}
+    for col in columns:
+        parsed = pd.to_datetime(col, errors='coerce', dayfirst=True)
+        if not pd.isna(parsed) and parsed.year in years_to_load:
+            month_headers[col] = parsed
+    return month_headers
+
+
+def month_column_name(prefix, timestamp):
+    """
+    Format a month as fact column name, e.g. 'b_jan_23'.
+
+    Args:
+        prefix (str): 'b_' for budget or 'f_' for forecast.
+        timestamp (pd.Timestamp): Any date in the month.
+
+    Returns:
+        str: Column name.
+    """
+    return f"{prefix}{MONTH_ABBREVIATIONS[timestamp.month]}_{str(timestamp.year)[2:]}"
@@ -1,47 +1,5 @@
-import pandas as pd
 import pyodbc
 import db_config as db_config
-from file_paths import path_KSReport
-
-# Helper functions:
-def get_year_month_columns(file_path, sheet_name, years_to_load):
-    """
-    Extract the month columns for the pre-defined years from an Excel sheet
-    and format them as `jan_yy` for each year.
-
-    Args:
-        file_path (str): Path to the Excel file.
-        sheet_name (str): Name of the sheet in the Excel file.
-
-    Returns:
-        list: A list of formatted month columns for the pre-defined years
-    """
-
-    # Read the header of the Excel sheet to get the column names
-    df = pd.read_excel(file_path, sheet_name=sheet_name, nrows=1)
-
-    print("Column headers in Excel file:", df.columns)  # Debug print to check column names
-
-    # Extract columns related to the pre-defined years and format them
-    month_columns = []
-    for column in df.columns:
-        # Check if the column is datetime-like and belongs to the current year
-        if isinstance(column, pd.Timestamp) or pd.to_datetime(column, errors='coerce') is not pd.NaT:
-            dt_column = pd.to_datetime(column, errors='coerce')
-            if dt_column.year in years_to_load:  # Only include columns from the pre-defined years
-                month = dt_column.strftime('%b_%y').lower()  # Format as 'jan_yy' and make lowercase
-                month_columns.append(month)
-        elif isinstance(column, str) and any(str(year)[-2:] in column for year in years_to_load):  # Handle string columns with the year
-            try:
-                dt_column = pd.to_datetime(column, format='%b.%y', errors='coerce')
-                if dt_column and dt_column.year in years_to_load:
-                    month = dt_column.strftime('%b_%y').lower()  # Format as 'jan_yy' and make lowercase
-                    month_columns.append(month)
-            except ValueError:
-                continue  # Skip if the string cannot be parsed
-
-    print(f"Detected month columns for the pre-defined years:", month_columns)  # Debug print to check extracted month columns
-    return month_columns
 
 def create_material_table(cursor):
     query = """IF NOT EXISTS(SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'dim_material_2')
@@ -106,36 +64,37 @@ def create_dim_time_table(cursor):
 
 
 # fact table creator:
-def create_fact_table(cursor, month_columns):
+def create_fact_table(cursor):
     """
-    Create a fact table for saving the budget and forecast data.
+    Create a fact table for saving the budget, forecast and shutdown hours data in a long layout:
+    one row per material, time, scenario and version.
+
+    Scenarios:
+        'budget', 'forecast': monthly values per material (time_id of the month, day=0).
+        'budget_shutdown', 'forecast_shutdown': daily shutdown hours (material_id NULL).
 
     Args:
         cursor: pyodbc cursor object.
-        month_columns (list): List of formatted month columns.
     """
     create_table_query = """
         IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'fact_table')
         BEGIN
             CREATE TABLE fact_table (
-                id INT PRIMARY KEY IDENTITY(1,1),
+                id INT IDENTITY(1,1) NOT NULL,
                 material_id VARCHAR(20),
-                time_id INT,
+                time_id INT NOT NULL,
+                scenario VARCHAR(20) NOT NULL,
                 version_name VARCHAR(100),
-                bdgt_shutdown_hours FLOAT,
-                fcst_shutdown_hours FLOAT,
+                value FLOAT,
                 inserted_date DATETIME DEFAULT GETDATE(),
+                CONSTRAINT PK_fact_table PRIMARY KEY NONCLUSTERED (id),
                 FOREIGN KEY (material_id) REFERENCES dim_material(dim_material_id),
                 FOREIGN KEY (time_id) REFERENCES dim_time(dim_time_id)
-    """
-
-    # Add two columns for each month in the current year: one for budget (b_) and one for forecast (f_)
-    for month in month_columns:
-        create_table_query += f",\n[b_{month}] DECIMAL(18, 2)"  # Budget value columns
-        create_table_query += f",\n[f_{month}] DECIMAL(18, 2)"  # Forecast value columns
-
-    # Close the CREATE TABLE query
-    create_table_query += "\n); END;"
+            );
+            CREATE CLUSTERED INDEX IX_fact_table_version_scenario_material_time
+                ON fact_table (version_name, scenario, material_id, time_id);
+        END;
+        """
 
     # Execute the query
     print("Executing fact_table creation query...")
@@ -143,6 +102,356 @@ def create_fact_table(cursor, month_columns):
     print("fact_table created.")
 
 
+# Secondary indexes of fact_table: name -> (key columns, included columns, filter)
+FACT_TABLE_INDEXES = {
+    # Latest value per material, time and scenario (change detection, dbo.fact_version):
+    # rows arrive already ordered by the ROW_NUMBER partition and sort keys, no sort and no lookups
+    "IX_fact_table_latest": (
+        "scenario, material_id, time_id, inserted_date DESC, id DESC", "value, version_name", None
+    ),
+    # Daily shutdown hours only (latest shutdown hours, get_shutdown_dates)
+    "IX_fact_table_shutdown": (
+        "scenario, time_id, inserted_date DESC, id DESC", "value, version_name", "material_id IS NULL"
+    ),
+}
+
+
+def create_fact_indexes(cursor):
+    """
+    Create the secondary indexes of fact_table that do not exist yet.
+    Lookups by version_name are served by the clustered index (version_name, scenario, material_id, time_id).
+
+    Args:
+        cursor: pyodbc cursor object.
+    """
+    for index_name, (key_columns, included_columns, index_filter) in FACT_TABLE_INDEXES.items():
+        where_clause = f"WHERE {index_filter}" if index_filter else ""
+        create_index_query = f"""
+            IF NOT EXISTS (
+                SELECT * FROM sys.indexes WHERE name = '{index_name}' AND object_id = OBJECT_ID('fact_table')
+            )
+                CREATE NONCLUSTERED INDEX {index_name} ON fact_table ({key_columns})
+                INCLUDE ({included_columns})
+                {where_clause};
+            """
+        cursor.execute(create_index_query)
+    print(f"fact_table indexes created: {list(FACT_TABLE_INDEXES)}")
+
+
+def maintain_fact_indexes(cursor, reorganize_threshold=5.0, rebuild_threshold=30.0):
+    """
+    Create missing fact_table indexes, then reorganize or rebuild fragmented ones and update the statistics.
+
+    Args:
+        cursor: pyodbc cursor object.
+        reorganize_threshold (float): Fragmentation in percent above which an index is reorganized.
+        rebuild_threshold (float): Fragmentation in percent above which an index is rebuilt.
+    """
+    create_fact_indexes(cursor)
+
+    cursor.execute("""
+        SELECT i.name, s.avg_fragmentation_in_percent
+        FROM sys.dm_db_index_physical_stats(DB_ID(), OBJECT_ID('fact_table'), NULL, NULL, 'LIMITED') s
+        INNER JOIN sys.indexes i ON i.object_id = s.object_id AND i.index_id = s.index_id
+        WHERE i.name IS NOT NULL AND s.page_count > 100
+    """)
+    for index_name, fragmentation in cursor.fetchall():
+        if fragmentation >= rebuild_threshold:
+            cursor.execute(f"ALTER INDEX {index_name} ON fact_table REBUILD;")
+            print(f"Rebuilt index {index_name} ({fragmentation:.1f}% fragmented).")
+        elif fragmentation >= reorganize_threshold:
+            cursor.execute(f"ALTER INDEX {index_name} ON fact_table REORGANIZE;")
+            print(f"Reorganized index {index_name} ({fragmentation:.1f}% fragmented).")
+
+    cursor.execute("UPDATE STATISTICS fact_table;")
+    print("fact_table indexes maintained.")
+
+
+def migrate_wide_fact_table(cursor):
+    """
+    Convert an existing wide fact_table (one b_mon_yy / f_mon_yy column per month) into the long layout.
+    The wide table is kept as 'fact_table_wide' and its values are copied with their inserted_date.
+
+    Args:
+        cursor: pyodbc cursor object.
+    """
+    # Only a wide fact_table has the shutdown hour columns
+    cursor.execute("""
+        SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_NAME = 'fact_table' AND COLUMN_NAME = 'bdgt_shutdown_hours'
+    """)
+    if cursor.fetchone()[0] == 0:
+        return
+
+    print("Migrating wide fact_table to the long layout...")
+    cursor.execute("EXEC sp_rename 'fact_table', 'fact_table_wide'")
+    create_fact_table(cursor)
+
+    # Month columns of the wide table
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_NAME = 'fact_table_wide' AND (COLUMN_NAME LIKE 'b[_]%' OR COLUMN_NAME LIKE 'f[_]%')
+    """)
+    month_columns = [row[0] for row in cursor.fetchall()]
+
+    # Unpivot every wide row into one row per non-NULL value
+    scenario_values = [
+        f"('{'budget' if col.startswith('b_') else 'forecast'}', w.[{col}])" for col in month_columns
+    ]
+    scenario_values += ["('budget_shutdown', w.bdgt_shutdown_hours)", "('forecast_shutdown', w.fcst_shutdown_hours)"]
+
+    migrate_query = f"""
+        INSERT INTO fact_table (material_id, time_id, scenario, version_name, value, inserted_date)
+        SELECT w.material_id, w.time_id, v.scenario, w.version_name, v.value, w.inserted_date
+        FROM fact_table_wide w
+        CROSS APPLY (VALUES {", ".join(scenario_values)}) AS v(scenario, value)
+        WHERE v.value IS NOT NULL
+          AND ((w.material_id IS NOT NULL AND v.scenario IN ('budget', 'forecast'))
+            OR (w.material_id IS NULL AND v.scenario IN ('budget_shutdown', 'forecast_shutdown')))
+        ORDER BY w.id
+    """
+    cursor.execute(migrate_query)
+    print(f"Migrated {cursor.rowcount} values from fact_table_wide into fact_table.")
+
+
+def create_dim_version_table(cursor):
+    """
+    Create a dimension table that registers every loaded version with its source file, load timestamp,
+    scenario coverage, date span and written row counts. Version listings and uniqueness checks read
+    this table instead of scanning fact_table.
+
+    Args:
+        cursor: pyodbc cursor object.
+    """
+    create_table_query = """
+        IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'dim_version')
+        BEGIN
+            CREATE TABLE dim_version (
+                version_name VARCHAR(100) PRIMARY KEY,
+                source_file VARCHAR(255),
+                loaded_at DATETIME NOT NULL DEFAULT GETDATE(),
+                has_budget BIT NOT NULL DEFAULT 0,
+                has_forecast BIT NOT NULL DEFAULT 0,
+                has_budget_shutdown BIT NOT NULL DEFAULT 0,
+                has_forecast_shutdown BIT NOT NULL DEFAULT 0,
+                first_date DATE,
+                last_date DATE,
+                budget_rows INT NOT NULL DEFAULT 0,
+                forecast_rows INT NOT NULL DEFAULT 0,
+                budget_shutdown_rows INT NOT NULL DEFAULT 0,
+                forecast_shutdown_rows INT NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IX_dim_version_loaded_at ON dim_version (loaded_at);
+        END
+        """
+    cursor.execute(create_table_query)
+    print("dim_version table created.")
+
+
+def backfill_dim_version(cursor):
+    """
+    Register the versions that were loaded into fact_table before dim_version existed.
+    Their statistics are aggregated once from the stored fact rows.
+
+    Args:
+        cursor: pyodbc cursor object.
+    """
+    backfill_query = """
+        INSERT INTO dim_version (
+            version_name, source_file, loaded_at,
+            has_budget, has_forecast, has_budget_shutdown, has_forecast_shutdown,
+            first_date, last_date,
+            budget_rows, forecast_rows, budget_shutdown_rows, forecast_shutdown_rows
+        )
+        SELECT
+            ft.version_name, NULL, MAX(ft.inserted_date),
+            MAX(CASE WHEN ft.scenario = 'budget' THEN 1 ELSE 0 END),
+            MAX(CASE WHEN ft.scenario = 'forecast' THEN 1 ELSE 0 END),
+            MAX(CASE WHEN ft.scenario = 'budget_shutdown' THEN 1 ELSE 0 END),
+            MAX(CASE WHEN ft.scenario = 'forecast_shutdown' THEN 1 ELSE 0 END),
+            MIN(DATEFROMPARTS(dt.year, dt.month, CASE WHEN dt.day = 0 THEN 1 ELSE dt.day END)),
+            MAX(CASE WHEN dt.day = 0 THEN EOMONTH(DATEFROMPARTS(dt.year, dt.month, 1))
+                     ELSE DATEFROMPARTS(dt.year, dt.month, dt.day) END),
+            SUM(CASE WHEN ft.scenario = 'budget' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN ft.scenario = 'forecast' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN ft.scenario = 'budget_shutdown' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN ft.scenario = 'forecast_shutdown' THEN 1 ELSE 0 END)
+        FROM fact_table ft
+        INNER JOIN dim_time dt ON ft.time_id = dt.dim_time_id
+        WHERE ft.version_name IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM dim_version dv WHERE dv.version_name = ft.version_name)
+        GROUP BY ft.version_name
+    """
+    cursor.execute(backfill_query)
+    print(f"Registered {cursor.rowcount} existing versions in dim_version.")
+
+
+def create_fact_as_of_function(cursor):
+    """
+    Create the table-valued function dbo.fact_as_of(@as_of) that returns the values in force at a point in time:
+    for every material, time and scenario the newest fact row inserted up to @as_of.
+    Every cell of fact_current is resolved with one seek on IX_fact_table_latest (cell keys, inserted_date DESC),
+    so the cost depends on the number of cells and not on the length of the history.
+
+    Args:
+        cursor: pyodbc cursor object.
+    """
+    cursor.execute("IF OBJECT_ID('dbo.fact_as_of') IS NOT NULL DROP FUNCTION dbo.fact_as_of;")
+    cursor.execute("""
+        CREATE FUNCTION dbo.fact_as_of (@as_of DATETIME)
+        RETURNS TABLE
+        AS
+        RETURN (
+            SELECT cell.material_id, cell.time_id, cell.scenario, ft.version_name, ft.value, ft.inserted_date
+            FROM fact_current cell
+            CROSS APPLY (
+                SELECT TOP 1 f.version_name, f.value, f.inserted_date
+                FROM fact_table f
+                WHERE f.scenario = cell.scenario
+                  AND (f.material_id = cell.material_id OR (f.material_id IS NULL AND cell.material_id IS NULL))
+                  AND f.time_id = cell.time_id
+                  AND f.inserted_date <= @as_of
+                ORDER BY f.inserted_date DESC, f.id DESC
+            ) ft
+        );
+    """)
+    print("fact_as_of function created.")
+
+
+def create_fact_version_function(cursor):
+    """
+    Create the table-valued function dbo.fact_version(@version_name) that returns the complete logical
+    version: for every material, time and scenario the newest value loaded up to (and including) that version.
+    Needed because delta loads only store the cells that changed against the previous version.
+    It is dbo.fact_as_of at the load timestamp of the version in dim_version (falls back to its newest fact row).
+
+    Args:
+        cursor: pyodbc cursor object.
+    """
+    cursor.execute("IF OBJECT_ID('dbo.fact_version') IS NOT NULL DROP FUNCTION dbo.fact_version;")
+    cursor.execute("""
+        CREATE FUNCTION dbo.fact_version (@version_name VARCHAR(100))
+        RETURNS TABLE
+        AS
+        RETURN (
+            SELECT fa.material_id, fa.time_id, fa.scenario, @version_name AS version_name,
+                   fa.version_name AS source_version, fa.value, fa.inserted_date
+            FROM (
+                SELECT COALESCE(
+                    (SELECT loaded_at FROM dim_version WHERE version_name = @version_name),
+                    (SELECT MAX(inserted_date) FROM fact_table WHERE version_name = @version_name)
+                ) AS cutoff
+            ) version_cutoff
+            CROSS APPLY dbo.fact_as_of(version_cutoff.cutoff) fa
+        );
+    """)
+    print("fact_version function created.")
+
+
+def create_fact_current_table(cursor):
+    """
+    Create the snapshot table fact_current with exactly one latest value per material, time and scenario
+    (material_id NULL for the shutdown hours). It is maintained at the end of every Interface1WT load.
+
+    Args:
+        cursor: pyodbc cursor object.
+    """
+    create_table_query = """
+        IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'fact_current')
+        BEGIN
+            CREATE TABLE fact_current (
+                material_id VARCHAR(20),
+                time_id INT NOT NULL,
+                scenario VARCHAR(20) NOT NULL,
+                version_name VARCHAR(100),
+                value FLOAT,
+                inserted_date DATETIME,
+                FOREIGN KEY (material_id) REFERENCES dim_material(dim_material_id),
+                FOREIGN KEY (time_id) REFERENCES dim_time(dim_time_id)
+            );
+            CREATE UNIQUE CLUSTERED INDEX UX_fact_current_scenario_material_time
+                ON fact_current (scenario, material_id, time_id);
+        END
+        """
+    cursor.execute(create_table_query)
+    print("fact_current table created.")
+
+
+def backfill_fact_current(cursor):
+    """
+    Fill an empty fact_current with the latest value per material, time and scenario of fact_table.
+
+    Args:
+        cursor: pyodbc cursor object.
+    """
+    backfill_query = """
+        IF NOT EXISTS (SELECT 1 FROM fact_current)
+        BEGIN
+            WITH ranked AS (
+                SELECT material_id, time_id, scenario, version_name, value, inserted_date,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY scenario, material_id, time_id ORDER BY inserted_date DESC, id DESC
+                       ) AS rn
+                FROM fact_table
+            )
+            INSERT INTO fact_current (material_id, time_id, scenario, version_name, value, inserted_date)
+            SELECT material_id, time_id, scenario, version_name, value, inserted_date
+            FROM ranked
+            WHERE rn = 1;
+        END
+        """
+    cursor.execute(backfill_query)
+    print("fact_current filled from fact_table.")
+
+
+# load bookkeeping table creator:
+def add_row_version_columns(cursor):
+    """
+    Add a ROWVERSION column to dim_material and fact_current. SQL Server increases it on every insert
+    and update, so MAX(row_version) shows any change of the tables (used by the calculation cache).
+
+    Args:
+        cursor: pyodbc cursor object.
+    """
+    for table_name in ("dim_material", "fact_current"):
+        cursor.execute(f"""
+            IF COL_LENGTH('{table_name}', 'row_version') IS NULL
+                ALTER TABLE {table_name} ADD row_version ROWVERSION;
+        """)
+    print("row_version columns added to dim_material and fact_current.")
+
+
+def create_ks_load_ledger_table(cursor):
+    """
+    Create a ledger table that records every ingested KS report (content hash, size, mtime,
+    version name and row counts), so unchanged files can be skipped before parsing.
+
+    Args:
+        cursor: pyodbc cursor object.
+    """
+    create_table_query = """
+        IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'ks_load_ledger')
+        BEGIN
+            CREATE TABLE ks_load_ledger (
+                id INT PRIMARY KEY IDENTITY(1,1),
+                file_name VARCHAR(255) NOT NULL,
+                content_hash CHAR(64) NOT NULL,
+                file_size BIGINT NOT NULL,
+                file_mtime DATETIME NOT NULL,
+                version_name VARCHAR(100),
+                material_rows INT,
+                budget_rows INT,
+                forecast_rows INT,
+                shutdown_rows INT,
+                loaded_date DATETIME DEFAULT GETDATE()
+            );
+            CREATE INDEX IX_ks_load_ledger_content_hash ON ks_load_ledger (content_hash);
+        END
+        """
+    cursor.execute(create_table_query)
+    print("ks_load_ledger table created.")
+
+
 # Main function to create tables:
 def create_tables():
     """
@@ -155,21 +464,34 @@ def create_tables():
         conn = db_config.get_db_connection()
         cursor = conn.cursor()
 
-        # Define the years to load
-        years_to_load = [2023, 2024, 2025, 2026, 2027, 2028]
-
         #create_material_table(cursor)
 
         # Create the dimension tables
         create_dim_material_table(cursor)
         create_dim_time_table(cursor)
 
-        # Get the month columns for the current year
-        sheet_name = "Cons_Budget"
-        month_columns = get_year_month_columns(path_KSReport, sheet_name, years_to_load)
+        # Convert an existing wide fact table, then create the fact table
+        migrate_wide_fact_table(cursor)
+        create_fact_table(cursor)
+        maintain_fact_indexes(cursor)
+
+        # Create the version registry and register the already loaded versions
+        create_dim_version_table(cursor)
+        backfill_dim_version(cursor)
+
+        # Create and fill the current-state snapshot
+        create_fact_current_table(cursor)
+        backfill_fact_current(cursor)
+
+        # Change counters for the calculation cache
+        add_row_version_columns(cursor)
+
+        # Create the as-of and version functions (read fact_current and fact_table)
+        create_fact_as_of_function(cursor)
+        create_fact_version_function(cursor)
 
-        # Create the fact table
-        create_fact_table(cursor, month_columns)
+        # Create the load ledger
+        create_ks_load_ledger_table(cursor)
 
         # Commit the transaction
         conn.commit()
@@ -0,0 +1,89 @@
+"""
+Compare the Excel engines of excel_reader on the files in Input_Data/.
+
+Run from the project root:
+    python -m benchmarks.excel_engines [--repeat 3]
+
+Every case is read with each installed engine that supports the file format. The best time of
+--repeat runs is printed per case and engine.
+"""
+import argparse
+import glob
+import os
+import time
+
+from excel_reader import XLS_ENGINES, is_engine_available, read_excel
+from file_paths import INPUT_DATA, path_KSReport
+from Interface1WT.src.ks_report import KS_REPORT_SHEETS
+
+ENGINES = ["calamine", "openpyxl", "xlrd"]
+
+
+def build_cases():
+    """
+    Build the benchmark cases, one per access pattern used by the interfaces.
+
+    Returns:
+        list: (case name, file path, read_excel keyword arguments) tuples.
+    """
+    cases = [
+        ("KS report: all used sheets (Interface1WT)", path_KSReport,
+         dict(sheet_name=KS_REPORT_SHEETS, header=None, dtype=object)),
+        ("KS report: header row only", path_KSReport,
+         dict(sheet_name="Cons_Budget", nrows=1)),
+        ("KS report: Help date + shutdown h columns", path_KSReport,
+         dict(sheet_name="Help", header=1, usecols=[0, 4])),
+    ]
+
+    lgr_bwg_files = sorted(glob.glob(str(INPUT_DATA / "Lgr_Bwg" / "*.[Xx]ls")))
+    if lgr_bwg_files:
+        cases.append(("Lagerbewegung .xls (interface2_IST)", lgr_bwg_files[-1],
+                      dict(sheet_name=0, header=0, dtype=str)))
+
+    reactor_files = sorted(glob.glob(str(INPUT_DATA / "Reaktor_Data" / "*.xlsx")))
+    if reactor_files:
+        cases.append(("Reactor data, 8 columns (interface3OM)", reactor_files[-1],
+                      dict(header=None, skiprows=5, usecols=list(range(8)))))
+    return cases
+
+
+def time_read(file_path, engine, repeat, kwargs):
+    """
+    Read a file repeatedly and return the best wall time.
+
+    Returns:
+        float: Best time in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        read_excel(file_path, engine=engine, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Excel engines on Input_Data/.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case and engine (best time is reported).")
+    args = parser.parse_args()
+
+    engines = [engine for engine in ENGINES if is_engine_available(engine)]
+    print(f"Installed engines: {engines}")
+
+    for case_name, file_path, kwargs in build_cases():
+        print(f"\n{case_name}: {os.path.basename(file_path)}")
+        is_xls = file_path.lower().endswith(".xls")
+        for engine in engines:
+            # xlrd only reads .xls, openpyxl only .xlsx/.xlsm
+            supported = engine in XLS_ENGINES if is_xls else engine != "xlrd"
+            if not supported:
+                continue
+            try:
+                seconds = time_read(file_path, engine, args.repeat, kwargs)
+                print(f"  {engine:<10} {seconds:8.3f} s")
+            except Exception as e:
+                print(f"  {engine:<10} failed: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Measure the latency of the fact_table "latest value" queries with and without the secondary indexes.
+
+Run from the project root against a test database:
+    python -m benchmarks.fact_indexes [--repeat 5]
+
+The queries are timed with the indexes of schema_creator.FACT_TABLE_INDEXES ("after"), then the
+indexes are dropped inside the open transaction and the queries are timed again ("before").
+The transaction is rolled back at the end, so the indexes stay in place.
+"""
+import argparse
+import time
+
+import db_config
+from Interface1WT.src.schema_creator import FACT_TABLE_INDEXES, create_fact_indexes
+
+
+def build_queries(cursor):
+    """
+    Build the benchmarked queries, one per access pattern.
+
+    Returns:
+        list: (query name, function(cursor)) tuples.
+    """
+    cursor.execute("SELECT TOP 1 version_name FROM dim_version ORDER BY loaded_at DESC")
+    row = cursor.fetchone()
+    latest_version = row[0] if row else None
+
+    def latest_values(scenario):
+        def run_query(cur):
+            cur.execute("""
+                WITH ranked AS (
+                    SELECT material_id, time_id, value, version_name,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY material_id, time_id ORDER BY inserted_date DESC, id DESC
+                           ) AS rn
+                    FROM fact_table
+                    WHERE scenario = ? AND material_id IS NOT NULL
+                )
+                SELECT material_id, time_id, value, version_name FROM ranked WHERE rn = 1
+            """, (scenario,))
+            cur.fetchall()
+        return run_query
+
+    def latest_shutdown_hours(cur):
+        cur.execute("""
+            WITH ranked AS (
+                SELECT time_id, value, version_name,
+                       ROW_NUMBER() OVER (PARTITION BY time_id ORDER BY inserted_date DESC, id DESC) AS rn
+                FROM fact_table
+                WHERE scenario = 'budget_shutdown' AND material_id IS NULL
+            )
+            SELECT time_id, value, version_name FROM ranked WHERE rn = 1
+        """)
+        cur.fetchall()
+
+    def fact_version(cur):
+        cur.execute("SELECT COUNT(*) FROM dbo.fact_version(?)", (latest_version,))
+        cur.fetchall()
+
+    def shutdown_dates(cur):
+        cur.execute("""
+            SELECT ft.value, dt.year, dt.month, dt.day, ft.version_name
+            FROM fact_table ft
+            INNER JOIN dim_time dt ON ft.time_id = dt.dim_time_id
+            WHERE ft.material_id IS NULL AND ft.scenario IN ('budget_shutdown', 'forecast_shutdown') AND ft.value > 0
+        """)
+        cur.fetchall()
+
+    queries = [
+        ("latest budget values", latest_values("budget")),
+        ("latest forecast values", latest_values("forecast")),
+        ("latest budget shutdown hours", latest_shutdown_hours),
+        ("shutdown dates", shutdown_dates),
+    ]
+    if latest_version is not None:
+        queries.append((f"fact_version('{latest_version}')", fact_version))
+    return queries
+
+
+def time_queries(cursor, queries, repeat):
+    """
+    Run every query repeatedly and return the best wall time per query.
+
+    Returns:
+        dict: Query name -> best time in seconds.
+    """
+    timings = {}
+    for name, run_query in queries:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run_query(cursor)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fact_table indexes.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query (best time is reported).")
+    args = parser.parse_args()
+
+    conn = db_config.get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM fact_table")
+        print(f"fact_table rows: {cursor.fetchone()[0]}")
+
+        queries = build_queries(cursor)
+
+        create_fact_indexes(cursor)
+        after = time_queries(cursor, queries, args.repeat)
+
+        for index_name in FACT_TABLE_INDEXES:
+            cursor.execute(f"DROP INDEX {index_name} ON fact_table")
+        before = time_queries(cursor, queries, args.repeat)
+
+        print(f"\n{'query':<45} {'before':>10} {'after':>10} {'speedup':>8}")
+        for name, _ in queries:
+            speedup = before[name] / after[name] if after[name] > 0 else float("inf")
+            print(f"{name:<45} {before[name]:>9.3f}s {after[name]:>9.3f}s {speedup:>7.1f}x")
+    finally:
+        # Restores the dropped indexes
+        conn.rollback()
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import importlib.util
+import os
+
+import pandas as pd
+
+
+# Engine used for all Excel reads, can be forced with the environment variable EXCEL_ENGINE
+# ("calamine", "openpyxl" or "xlrd"). Without it the fastest installed engine is used.
+EXCEL_ENGINE = os.environ.get("EXCEL_ENGINE")
+
+# Engines that can read the legacy .xls format
+XLS_ENGINES = ("calamine", "xlrd")
+
+
+def is_engine_available(engine):
+    """
+    Check if the Python package behind a pandas Excel engine is installed.
+
+    Args:
+        engine (str): "calamine", "openpyxl" or "xlrd".
+
+    Returns:
+        bool: True if the engine can be used.
+    """
+    module_name = "python_calamine" if engine == "calamine" else engine
+    return importlib.util.find_spec(module_name) is not None
+
+
+def select_engine(file_path, engine=None):
+    """
+    Choose the Excel engine for a file.
+    python-calamine (Rust, read-only, streams only the requested cells) is preferred for all formats.
+    Without it .xls files are read with xlrd and .xlsx/.xlsm files with openpyxl (read-only mode).
+
+    Args:
+        file_path (str): Path to the Excel file.
+        engine (str): Engine to force, defaults to EXCEL_ENGINE or the fastest installed engine.
+
+    Returns:
+        str: Engine name for pd.read_excel.
+    """
+    engine = engine or EXCEL_ENGINE
+    if engine:
+        return engine
+
+    if is_engine_available("calamine"):
+        return "calamine"
+    if str(file_path).lower().endswith(".xls"):
+        return "xlrd"
+    return "openpyxl"
+
+
+def read_excel(file_path, sheet_name=0, header=0, usecols=None, nrows=None, skiprows=None, dtype=None,
+               engine=None):
+    """
+    Read an Excel sheet with the selected engine and only the requested rows and columns.
+
+    Args:
+        file_path (str): Path to the Excel file.
+        sheet_name (int/str/list): Sheet name or index, or a list of sheets (returns a dict).
+        header (int/None): Row that holds the column names, None for raw cell grids.
+        usecols (list/str/callable/None): Columns to read (indexes, names, an Excel range like "A:E"
+            or a function that gets the column name and returns True for the columns to read).
+        nrows (int/None): Number of data rows to read (e.g. 1 for only the header).
+        skiprows (int/list/None): Rows to skip at the top of the sheet.
+        dtype: dtype for all cells or per column, e.g. str or object.
+        engine (str): Engine to force, see select_engine.
+
+    Returns:
+        pd.DataFrame or dict: The sheet data (dict of DataFrames if sheet_name is a list).
+    """
+    return pd.read_excel(
+        file_path,
+        sheet_name=sheet_name,
+        header=header,
+        usecols=usecols,
+        nrows=nrows,
+        skiprows=skiprows,
+        dtype=dtype,
+        engine=select_engine(file_path, engine),
+    )
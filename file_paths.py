@@ -31,7 +31,8 @@ PROJECT_ROOT = get_project_root()
 INPUT_DATA = PROJECT_ROOT / "Input_Data"
 
 # Paths
-path_KSReport = get_latest_excel_file(str(INPUT_DATA / "KS_Report"))
+path_KSReport_folder = str(INPUT_DATA / "KS_Report")
+path_KSReport = get_latest_excel_file(path_KSReport_folder)
 path_Reaktordata = str(INPUT_DATA / "Reaktor_Data")
 path_LgrBwg = str(INPUT_DATA / "Lgr_Bwg")
 
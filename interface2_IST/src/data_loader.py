@@ -4,12 +4,28 @@ from datetime import datetime
 
 from Interface1WT.src.calculations import get_dates_and_version_from_excel
 from db_config import get_db_connection
+from excel_reader import read_excel
 from file_paths import path_LgrBwg, path_variables
 from interface2_IST.src.CalculationIST import total_menge_for_interval, calculate_category_h_concs, calculate_category_n_concs, \
     calculate_category_RI_others, calculate_category_RE_others, calculate_category_OX_others, \
     _calculate_fluxes_concentrates
 
 
+# Columns of the Lagerbewegung files that are loaded into dim_lagerbewegung (in insert order)
+LGR_BWG_COLUMNS = [
+    "BpzIdt", "MatIdt", "KeziBez", "ChgNmr", "BpdSort", "MatArt", "KstUrsache", "PrzPre",
+    "LgrDW", "AbrSammler", "BucPer", "VrgGrp", "MngEinhIdt", "BucDat", "KwBezJahr_de",
+    "KwBezMon_de", "LOrtIdt", "LOrtBez", "LPlzIdt", "LPlzBez", "LgrFirmIdt", "LgrFirmName",
+    "MngW", "MngD", "Pb", "Ag", "Au", "Cu", "S", "Zn", "FeO", "SiO2", "CaO", "As", "Sb", "Bi", "Se", "Cl", "Cd"
+]
+
+
+def is_lgr_bwg_column(column_name):
+    """
+    Check if a raw header of a Lagerbewegung file is one of the loaded columns (headers may be quoted).
+    """
+    return str(column_name).strip().strip("'").strip() in LGR_BWG_COLUMNS
+
 
 def clean_data(df):
     """
@@ -23,13 +39,7 @@ def clean_data(df):
     print("Cleaned Columns:", df.columns.tolist())
 
     # Restrict to expected columns
-    expected_columns = [
-        "BpzIdt", "MatIdt", "KeziBez", "ChgNmr", "BpdSort", "MatArt", "KstUrsache", "PrzPre",
-        "LgrDW", "AbrSammler", "BucPer", "VrgGrp", "MngEinhIdt", "BucDat", "KwBezJahr_de",
-        "KwBezMon_de", "LOrtIdt", "LOrtBez", "LPlzIdt", "LPlzBez", "LgrFirmIdt", "LgrFirmName",
-        "MngW", "MngD", "Pb", "Ag", "Au", "Cu", "S", "Zn", "FeO", "SiO2", "CaO", "As", "Sb", "Bi", "Se", "Cl", "Cd"
-    ]
-    df = df[expected_columns]
+    df = df[LGR_BWG_COLUMNS]
 
     # Define column groups
     varchar_columns = [
@@ -62,12 +72,9 @@ def clean_data(df):
     print("Sample Cleaned DataFrame Rows:\n", df.head())
     return df
 
-def read_excel_auto(file_path, sheet_name=0, header=0, dtype=str):
-    file_lower = file_path.lower()
-    if file_lower.endswith(".xls"):
-        df = pd.read_excel(file_path, engine="xlrd", sheet_name=sheet_name, header=header, dtype=dtype)
-    else:
-        df = pd.read_excel(file_path, engine="openpyxl", sheet_name=sheet_name, header=header, dtype=dtype)
+def read_excel_auto(file_path, sheet_name=0, header=0, dtype=str, usecols=None):
+    # Engine is chosen by excel_reader (calamine if installed, else xlrd for .xls and openpyxl for .xlsx)
+    df = read_excel(file_path, sheet_name=sheet_name, header=header, dtype=dtype, usecols=usecols)
     return df
 
 
@@ -96,7 +103,8 @@ def load_dim_lagerbewegung_incre():
     new_rows_list = []
     for file_path in excel_files:
         print(f"Processing file: {file_path}")
-        df = read_excel_auto(file_path, sheet_name=0, header=0, dtype=str)
+        # Only the loaded columns are read from the file
+        df = read_excel_auto(file_path, sheet_name=0, header=0, dtype=str, usecols=is_lgr_bwg_column)
         df = clean_data(df)
 
         df["BpzIdt"] = df["BpzIdt"].astype(str)
@@ -3,6 +3,7 @@ import pandas as pd
 import pyodbc
 import json
 from db_config import get_db_connection
+from excel_reader import read_excel
 from file_paths import path_Reaktordata, jsonfile_reactor
 
 
@@ -37,7 +38,15 @@ def load_reactor_data(cursor, file_path):
     """
     try:
         # Lade die Excel-Datei ab Zeile 6 (Index 5)
-        df = pd.read_excel(file_path, header=None, skiprows=5)
+        df = read_excel(file_path, header=None, skiprows=5, usecols=list(range(8)))
+        # calamine returns trailing formatted but empty rows, which openpyxl skips
+        df = df.dropna(how="all").reset_index(drop=True)
+
+        # calamine reads whole numbers as floats, openpyxl as ints (columns without gaps)
+        for column in df.columns[1:]:
+            values = df[column]
+            if pd.api.types.is_float_dtype(values) and values.notna().all() and (values % 1 == 0).all():
+                df[column] = values.astype("int64")
 
         # Definiere die Spaltennamen korrekt
         df.columns = [
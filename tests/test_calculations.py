@@ -0,0 +1,38 @@
+import pandas as pd
+
+from Interface1WT.src.calculations import _budget_forecast_totals, _material_name_totals, _month_hours_table
+
+
+def _fact_rows(rows):
+    columns = ['material_id', 'material_name', 'material_type', 'category', 'scenario', 'year', 'month', 'value']
+    return pd.DataFrame(rows, columns=columns)
+
+
+def test_zero_budget_material_keeps_its_forecast():
+    # Delta loads store no zero cells: 1204001 has a forecast but no budget row in nov_24
+    start = pd.Timestamp("2024-11-01")
+    end = pd.Timestamp("2024-11-30 23:59")
+    month_hours = _month_hours_table(start, end)
+    rows = _fact_rows([("1204001", "Paste A", "Paste", "P", "forecast", 2024, 11, 720.0)])
+
+    budget_total, forecast_total = _budget_forecast_totals(rows, start, end, month_hours)
+
+    assert budget_total == 0
+    assert forecast_total > 0
+
+
+def test_material_totals_keep_materials_with_one_scenario():
+    start = pd.Timestamp("2024-11-01")
+    end = pd.Timestamp("2024-11-30 23:59")
+    month_hours = _month_hours_table(start, end)
+    rows = _fact_rows([
+        ("1204001", "Paste A", "Paste", "P", "forecast", 2024, 11, 720.0),
+        ("1101234", "Cons B", "Cons", "H", "budget", 2024, 11, 360.0),
+        ("1101234", "Cons B", "Cons", "H", "forecast", 2024, 11, 360.0),
+    ])
+
+    totals = _material_name_totals(rows, start, end, month_hours)
+
+    assert set(totals.index) == {"paste a", "cons b"}
+    assert totals.loc["paste a", "total_budget"] == 0
+    assert totals.loc["paste a", "total_forecast"] > 0